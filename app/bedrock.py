@@ -63,6 +63,9 @@ class ChatCompletions:
         for tool in tools:
             if tool.get("type") == "function":
                 function = tool.get("function", {})
+                # Resolve the nested dict once instead of repeating the
+                # .get(..., {}).get(...) chain per field
+                parameters = function.get("parameters", {})
                 bedrock_tool = {
                     "toolSpec": {
                         "name": function.get("name", ""),
@@ -70,12 +73,8 @@ class ChatCompletions:
                         "inputSchema": {
                             "json": {
                                 "type": "object",
-                                "properties": function.get("parameters", {}).get(
-                                    "properties", {}
-                                ),
-                                "required": function.get("parameters", {}).get(
-                                    "required", []
-                                ),
+                                "properties": parameters.get("properties", {}),
+                                "required": parameters.get("required", []),
                             }
                         },
                     }
@@ -133,17 +132,23 @@ class ChatCompletions:
 
     def _convert_bedrock_response_to_openai_format(self, bedrock_response):
         # Convert Bedrock response format to OpenAI format
+        # Resolve the nested message/usage dicts once up front; the chained
+        # .get(..., {}).get(...) probes below each allocated a fresh fallback
+        # dict and re-walked the response per field
+        message = bedrock_response.get("output", {}).get("message", {})
+        usage = bedrock_response.get("usage", {})
+        content_array = message.get("content")
+
         content = ""
-        if bedrock_response.get("output", {}).get("message", {}).get("content"):
-            content_array = bedrock_response["output"]["message"]["content"]
+        if content_array:
             content = "".join(item.get("text", "") for item in content_array)
         if content == "":
             content = "."
 
         # Handle tool calls in response
         openai_tool_calls = []
-        if bedrock_response.get("output", {}).get("message", {}).get("content"):
-            for content_item in bedrock_response["output"]["message"]["content"]:
+        if content_array:
+            for content_item in content_array:
                 if content_item.get("toolUse"):
                     bedrock_tool_use = content_item["toolUse"]
                     global CURRENT_TOOLUSE_ID
@@ -170,9 +175,7 @@ class ChatCompletions:
                     "index": 0,
                     "message": {
                         "content": content,
-                        "role": bedrock_response.get("output", {})
-                        .get("message", {})
-                        .get("role", "assistant"),
+                        "role": message.get("role", "assistant"),
                         "tool_calls": openai_tool_calls
                         if openai_tool_calls != []
                         else None,
@@ -181,13 +184,9 @@ class ChatCompletions:
                 }
             ],
             "usage": {
-                "completion_tokens": bedrock_response.get("usage", {}).get(
-                    "outputTokens", 0
-                ),
-                "prompt_tokens": bedrock_response.get("usage", {}).get(
-                    "inputTokens", 0
-                ),
-                "total_tokens": bedrock_response.get("usage", {}).get("totalTokens", 0),
+                "completion_tokens": usage.get("outputTokens", 0),
+                "prompt_tokens": usage.get("inputTokens", 0),
+                "total_tokens": usage.get("totalTokens", 0),
             },
         }
         return OpenAIResponse(openai_format)
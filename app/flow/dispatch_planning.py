@@ -1,7 +1,12 @@
+import asyncio
+import functools
+import hashlib
 import json
+import re
 import time
+from collections import Counter
 from enum import Enum
-from typing import Dict, List, Literal, Optional, Union
+from typing import Dict, Final, List, Literal, Optional, Tuple, Union
 
 from pydantic import Field
 
@@ -16,6 +21,76 @@ from app.config import config
 from app.tool import Terminate, ToolCollection
 from app.tool.ask_human import AskHuman
 
+# Matches step type markers like [SEARCH] or [CODE] in step text
+_STEP_TYPE_RE = re.compile(r"\[([A-Z_]+)\]")
+
+# Optional explicit step dependencies, e.g. "[depends_on: 0,2]"; steps without
+# the marker keep today's strictly serial execution order
+_DEPENDS_ON_RE = re.compile(r"\[depends_on:\s*([0-9][0-9,\s]*)\]", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_depends_on(step: str) -> tuple[int, ...]:
+    """Parse the ``[depends_on: i,j]`` marker from a step's text.
+
+    Step strings are immutable and the scheduler re-reads them every round,
+    so each unique step text is parsed at most once.
+    """
+    # Cheap substring check first; most steps carry no marker at all
+    if "[" not in step:
+        return ()
+    match = _DEPENDS_ON_RE.search(step)
+    if not match:
+        return ()
+    return tuple(int(d) for d in match.group(1).split(",") if d.strip())
+
+
+def _truncate(s: str, n: int = 50) -> str:
+    """Truncate a string to at most ``n`` characters, appending an ellipsis."""
+    return s if len(s) <= n else s[:n] + "..."
+
+
+def _build_step_info(step: str) -> dict:
+    """Build a step info dict, extracting the optional [TYPE] marker."""
+    step_info = {"text": step}
+    # Try to extract step type from the text (e.g., [SEARCH] or [CODE])
+    type_match = _STEP_TYPE_RE.search(step) if "[" in step else None
+    if type_match:
+        step_info["type"] = type_match.group(1).lower()
+    return step_info
+
+
+# 规划结果缓存上限：满了按 FIFO 淘汰最早条目，防止长驻进程上无界增长
+_PLAN_CACHE_MAX: Final[int] = 128
+
+# 规划结果缓存: (请求, 工具目录, 执行者) 摘要 -> planning 工具参数。
+# 模块级共享：入口脚本每个请求都会新建一个流程实例，放在实例上缓存永远不会命中
+_PLAN_CACHE: Dict[str, dict] = {}
+
+# 警单信息（请求级内容，附在用户消息中）
+_CASE_INFO: Final[str] = """【已知警单内容】
+        接警单编号：123
+        管辖单位代码：4444
+        案发地点：广州天河
+        坐标：x=20.1, y=55.9
+        """
+
+# 规划系统提示词模板：只在导入时解析一次，渲染后的字节与模板保持一致，
+# 便于服务端前缀缓存命中
+_SYSTEM_PROMPT_TEMPLATE: Final[
+    str
+] = """You are a planning assistant. Create a concise, actionable plan with clear steps.
+
+        【规划规则】
+        1. **严格工具映射**：仅生成与 MCP 工具直接相关的步骤，直接从警单中提取参数（如坐标、单位代码），无需额外询问，禁止添加分析、记录等非工具操作。
+        2. **输出格式**：格式必须为：使用 [工具标题]（工具名） 参数为 [参数名1]: [值1], [参数名2]: [值2], ...
+        3. **单步输出**：若指令匹配一个工具且参数齐全，仅生成一步计划。
+        4. **缺参处理**：若参数不全，生成一步调用 `ask_human` 的计划。
+
+        {tools_info}
+        """
+
+
 class PlanStepStatus(str, Enum):
     """Enum class defining possible statuses of a plan step"""
 
@@ -25,14 +100,14 @@ class PlanStepStatus(str, Enum):
     BLOCKED = "blocked"
 
     @classmethod
-    def get_all_statuses(cls) -> list[str]:
-        """Return a list of all possible step status values"""
-        return [status.value for status in cls]
+    def get_all_statuses(cls) -> tuple[str, ...]:
+        """Return all possible step status values"""
+        return _ALL_STATUSES
 
     @classmethod
-    def get_active_statuses(cls) -> list[str]:
-        """Return a list of values representing active statuses (not started or in progress)"""
-        return [cls.NOT_STARTED.value, cls.IN_PROGRESS.value]
+    def get_active_statuses(cls) -> frozenset[str]:
+        """Return the set of active statuses (not started or in progress)"""
+        return _ACTIVE_STATUSES
 
     @classmethod
     def get_status_marks(cls) -> Dict[str, str]:
@@ -45,13 +120,23 @@ class PlanStepStatus(str, Enum):
         }
 
 
+# Computed once at import time so membership checks and renders reuse the
+# same containers instead of rebuilding them per call
+_STATUS_MARKS = PlanStepStatus.get_status_marks()
+_ALL_STATUSES = tuple(status.value for status in PlanStepStatus)
+_ACTIVE_STATUSES = frozenset(
+    (PlanStepStatus.NOT_STARTED.value, PlanStepStatus.IN_PROGRESS.value)
+)
+
+
 class PlanningFlow(BaseFlow):
     """A flow that manages planning and execution of tasks using agents."""
 
     llm: LLM = Field(default_factory=lambda: LLM())
     planning_tool: PlanningTool = Field(default_factory=PlanningTool)
     executor_keys: List[str] = Field(default_factory=list)
-    active_plan_id: str = Field(default_factory=lambda: f"plan_{int(time.time())}")
+    # 纳秒时间戳十六进制：比秒级 int(time.time()) 更不易撞号，也省去格式化开销
+    active_plan_id: str = Field(default_factory=lambda: f"plan_{time.time_ns():x}")
     current_step_index: Optional[int] = None
 
     # MCP clients for remote tool access
@@ -67,6 +152,23 @@ class PlanningFlow(BaseFlow):
         )
     )
 
+    # MCP 工具列表缓存: (已连接服务器集合, 刷新时间戳, 格式化的工具描述列表)
+    _mcp_tools_cache: Optional[Tuple[frozenset, float, List[str]]] = None
+    _mcp_tools_cache_ttl: float = 300.0
+    # 串行化并发连接时对 connected_servers/available_tools 的修改
+    _mcp_setup_lock: Optional[asyncio.Lock] = None
+    # 计划文本缓存：计划内容只在创建/标记步骤时变化，用脏标记避免逐步重渲染
+    _plan_text_cache: Optional[str] = None
+    _plan_dirty: bool = True
+    # 已完成步骤单调递增，游标避免每轮从第 0 步重新扫描
+    _next_step_cursor: int = 0
+    # 步骤提示词前缀缓存: (计划文本, 前缀)，保证同一计划版本内前缀逐字节一致
+    _step_prefix_cache: Optional[Tuple[str, str]] = None
+    # 计划依赖结构缓存: (步骤元组, 每步依赖, 是否含依赖标记)；步骤未变时直接复用
+    _plan_deps_cache: Optional[Tuple[tuple, tuple, bool]] = None
+    # 暴露 state 属性的执行者 id 集合，避免热循环里反复 hasattr
+    _stateful_executor_ids: set = set()
+
     def __init__(
         self, agents: Union[BaseAgent, List[BaseAgent], Dict[str, BaseAgent]], **data
     ):
@@ -90,6 +192,12 @@ class PlanningFlow(BaseFlow):
         if not self.executor_keys:
             self.executor_keys = list(self.agents.keys())
 
+        # Whether an executor exposes `state` is static per agent; compute it
+        # once instead of calling hasattr on every loop iteration
+        self._stateful_executor_ids = {
+            id(agent) for agent in self.agents.values() if hasattr(agent, "state")
+        }
+
     def get_executor(self, step_type: Optional[str] = None) -> BaseAgent:
         """
         Get an appropriate executor agent for the current step.
@@ -130,32 +238,128 @@ class PlanningFlow(BaseFlow):
 
             result = ""
             while True:
-                # Get current step to execute
-                self.current_step_index, step_info = await self._get_current_step_info()
+                # Get the frontier of executable steps; more than one only
+                # when steps declare explicit [depends_on: ...] metadata
+                ready_steps = await self._get_ready_steps()
 
                 # Exit if no more steps or plan completed
-                if self.current_step_index is None:
+                if not ready_steps:
                     result += await self._finalize_plan()
                     break
 
-                # Execute current step with appropriate agent
-                step_type = step_info.get("type") if step_info else None
-                executor = self.get_executor(step_type)
-                step_result = await self._execute_step(executor, step_info)
-                result += step_result + "\n"
+                if len(ready_steps) == 1:
+                    # Execute current step with appropriate agent
+                    index, step_info = ready_steps[0]
+                    self.current_step_index = index
+                    step_type = step_info.get("type") if step_info else None
+                    executor = self.get_executor(step_type)
+                    step_result = await self._execute_step(
+                        executor, step_info, step_index=index
+                    )
+                    result += step_result + "\n"
+
+                    # Check if agent wants to terminate
+                    if (
+                        id(executor) in self._stateful_executor_ids
+                        and executor.state is AgentState.FINISHED
+                    ):
+                        break
+                else:
+                    # Independent steps: group them by executor. An agent can
+                    # only run one step at a time (BaseAgent.run requires the
+                    # IDLE state), so steps sharing an executor run serially
+                    # within their group while distinct executors proceed
+                    # concurrently
+                    groups: Dict[int, tuple] = {}
+                    for index, step_info in ready_steps:
+                        executor = self.get_executor(
+                            step_info.get("type") if step_info else None
+                        )
+                        groups.setdefault(id(executor), (executor, []))[1].append(
+                            (index, step_info)
+                        )
 
-                # Check if agent wants to terminate
-                if hasattr(executor, "state") and executor.state == AgentState.FINISHED:
-                    break
+                    async def _run_group(executor, items) -> List[str]:
+                        return [
+                            await self._execute_step(
+                                executor, step_info, step_index=index
+                            )
+                            for index, step_info in items
+                        ]
+
+                    executors = [executor for executor, _ in groups.values()]
+                    group_results = await asyncio.gather(
+                        *(
+                            _run_group(executor, items)
+                            for executor, items in groups.values()
+                        ),
+                        return_exceptions=True,
+                    )
+                    for group_result in group_results:
+                        if isinstance(group_result, Exception):
+                            result += f"Error executing step: {group_result}\n"
+                        else:
+                            result += "".join(r + "\n" for r in group_result)
+
+                    # Check if any agent wants to terminate
+                    if any(
+                        id(executor) in self._stateful_executor_ids
+                        and executor.state is AgentState.FINISHED
+                        for executor in executors
+                    ):
+                        break
 
             return result
         except Exception as e:
             logger.error(f"Error in PlanningFlow: {str(e)}")
             return f"Execution failed: {str(e)}"
 
+    async def _list_mcp_tools_info(self) -> List[str]:
+        """List formatted MCP tool descriptions, cached per connected-server set.
+
+        Tool catalogs rarely change during a session, so the per-server
+        `list_tools` RPCs are only refreshed when the set of connected servers
+        changes or the cache TTL expires. The cache is invalidated on
+        connect/disconnect events.
+        """
+        if not hasattr(self.primary_agent, "mcp_clients"):
+            return []
+
+        sessions = self.primary_agent.mcp_clients.sessions
+        cache_key = frozenset(sessions.keys())
+        if self._mcp_tools_cache is not None:
+            key, timestamp, tools_info = self._mcp_tools_cache
+            if key == cache_key and time.time() - timestamp < self._mcp_tools_cache_ttl:
+                return tools_info
+
+        # 并行刷新各服务器的工具列表，避免串行 RPC 叠加延迟
+        server_ids = list(sessions.keys())
+        responses = await asyncio.gather(
+            *(session.list_tools() for session in sessions.values()),
+            return_exceptions=True,
+        )
+
+        mcp_tools_info = []
+        for server_id, response in zip(server_ids, responses):
+            if isinstance(response, Exception):
+                logger.error(
+                    f"Failed to list tools from MCP server {server_id}: {response}"
+                )
+                continue
+            mcp_tools_info.extend(
+                [
+                    f"- {tool.name}: {tool.description} (参数: {tool.inputSchema})"
+                    for tool in response.tools
+                ]
+            )
+
+        self._mcp_tools_cache = (cache_key, time.time(), mcp_tools_info)
+        return mcp_tools_info
+
     async def _create_initial_plan(self, request: str) -> None:
         """Create an initial plan based on the request using the flow's LLM and PlanningTool."""
         logger.info(f"Creating initial plan with ID: {self.active_plan_id}")
+        self._next_step_cursor = 0
 
         # system_message_content = (
         #     "You are a planning assistant. Create a concise, actionable plan with clear steps. "
@@ -164,48 +368,28 @@ class PlanningFlow(BaseFlow):
         # )
 
         # 1. 获取 MCP 工具列表（假设 primary_agent 是 Dispatcher 或 MCPAgent）
-        mcp_tools_info = []
-        if hasattr(self.primary_agent, "mcp_clients"):
-            for server_id, session in self.primary_agent.mcp_clients.sessions.items():
-                try:
-                    response = await session.list_tools()
-                    mcp_tools_info.extend(
-                        [
-                            f"- {tool.name}: {tool.description} (参数: {tool.inputSchema})"
-                            for tool in response.tools
-                        ]
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Failed to list tools from MCP server {server_id}: {e}"
-                    )
+        mcp_tools_info = await self._list_mcp_tools_info()
 
         # 2. 构建提示词，包含警单信息和工具列表
-        case_info = """【已知警单内容】
-        接警单编号：123
-        管辖单位代码：4444
-        案发地点：广州天河
-        坐标：x=20.1, y=55.9
-        """
+        # 工具列表/执行者按名称排序，保证多次规划的系统提示词逐字节一致；
+        # 排序结果同时用于缓存键，只算一次
+        sorted_tools_info = sorted(mcp_tools_info)
+        sorted_executor_keys = sorted(self.executor_keys)
         tools_info = (
-            "【可用 MCP 工具】\n" + "\n".join(mcp_tools_info)
+            "【可用 MCP 工具】\n" + "\n".join(sorted_tools_info)
             if mcp_tools_info
             else "无可用工具"
         )
 
-        system_message_content = f"""You are a planning assistant. Create a concise, actionable plan with clear steps.
-        {case_info}
-        {tools_info}
-
-        【规划规则】
-        1. **严格工具映射**：仅生成与 MCP 工具直接相关的步骤，直接从警单中提取参数（如坐标、单位代码），无需额外询问，禁止添加分析、记录等非工具操作。
-        2. **输出格式**：格式必须为：使用 [工具标题]（工具名） 参数为 [参数名1]: [值1], [参数名2]: [值2], ...
-        3. **单步输出**：若指令匹配一个工具且参数齐全，仅生成一步计划。
-        4. **缺参处理**：若参数不全，生成一步调用 `ask_human` 的计划。
-        """
+        # 系统提示词只放稳定内容（规则在前、工具列表在后），警单等请求级信息
+        # 放到用户消息中。前缀逐字节一致（且 >=1024 token）时才能命中
+        # LLM 服务端的 prompt 前缀缓存。
+        system_message_content = _SYSTEM_PROMPT_TEMPLATE.format_map(
+            {"tools_info": tools_info}
+        )
 
         agents_description = []
-        for key in self.executor_keys:
+        for key in sorted_executor_keys:
             if key in self.agents:
                 agents_description.append(
                     {
@@ -214,23 +398,49 @@ class PlanningFlow(BaseFlow):
                     }
                 )
         if len(agents_description) > 1:
-            # Add description of agents to select
+            # Add description of agents to select; the JSON dump is the single
+            # canonical form (interpolating the Python repr as well doubled
+            # the token count for the same information)
+            agents_json = json.dumps(
+                agents_description, sort_keys=True, ensure_ascii=False
+            )
             system_message_content += (
-                f"\nNow we have {agents_description} agents. "
-                f"The infomation of them are below: {json.dumps(agents_description)}\n"
+                f"\nNow we have {len(agents_description)} agents. "
+                f"The infomation of them are below: {agents_json}\n"
                 "When creating steps in the planning tool, please specify the agent names using the format '[agent_name]'."
             )
 
         # Create a system message for plan creation
         system_message = Message.system_message(system_message_content)
 
-        # Create a user message with the request
+        # Create a user message with the request and per-request case info
         user_message = Message.user_message(
+            f"{_CASE_INFO}\n"
             f"Create a reasonable plan with clear steps to accomplish the task: {request}"
         )
 
-        logger.info(f"----------------------: {system_message}")
-        logger.info(f"----------------------: {user_message}")
+        # 规划器在 temperature=0 时对相同输入是确定性的：命中缓存直接重放
+        # planning 工具参数，省掉一次完整的 LLM 调用
+        cache_key = None
+        if not self.llm.temperature:
+            cache_key = hashlib.blake2b(
+                f"{request}|{sorted_tools_info}|{sorted_executor_keys}".encode(),
+                digest_size=16,
+            ).hexdigest()
+            cached_args = _PLAN_CACHE.get(cache_key)
+            if cached_args is not None:
+                args = dict(cached_args, plan_id=self.active_plan_id)
+                result = await self.planning_tool.execute(**args)
+                self._plan_dirty = True
+                logger.info(f"Plan creation result (from cache): {str(result)}")
+                return
+
+        # Full prompt dumps are large; format them lazily so the strings are
+        # only built when a DEBUG sink is active
+        logger.opt(lazy=True).debug(
+            "plan system message: {}", lambda: str(system_message)
+        )
+        logger.opt(lazy=True).debug("plan user message: {}", lambda: str(user_message))
 
         # Call LLM with PlanningTool
         response = await self.llm.ask_tool(
@@ -258,8 +468,14 @@ class PlanningFlow(BaseFlow):
 
                     # Execute the tool via ToolCollection instead of directly
                     result = await self.planning_tool.execute(**args)
-
-                    logger.info(f"Plan creation result: {str(result)}")
+                    self._plan_dirty = True
+
+                    logger.info("Plan creation result: {}", result)
+                    if cache_key is not None:
+                        if len(_PLAN_CACHE) >= _PLAN_CACHE_MAX:
+                            # dict 保留插入顺序，弹出首个键即 FIFO
+                            _PLAN_CACHE.pop(next(iter(_PLAN_CACHE)))
+                        _PLAN_CACHE[cache_key] = dict(args)
                     return
 
         # If execution reached here, create a default plan
@@ -270,10 +486,112 @@ class PlanningFlow(BaseFlow):
             **{
                 "command": "create",
                 "plan_id": self.active_plan_id,
-                "title": f"Plan for: {request[:50]}{'...' if len(request) > 50 else ''}",
+                "title": f"Plan for: {_truncate(request)}",
                 "steps": ["Analyze request", "Execute task", "Verify results"],
             }
         )
+        self._plan_dirty = True
+
+    async def _get_ready_steps(self) -> List[tuple[int, dict]]:
+        """Collect the steps that are ready to execute.
+
+        Steps may declare explicit dependencies in their text with a
+        ``[depends_on: i,j]`` marker. When at least one step carries the
+        marker, every active step whose dependencies are all completed is
+        returned so independent steps can run concurrently. Without markers
+        there is no dependency metadata and execution stays strictly serial:
+        only the first active step is returned, exactly as before.
+        """
+        if (
+            not self.active_plan_id
+            or self.active_plan_id not in self.planning_tool.plans
+        ):
+            index, step_info = await self._get_current_step_info()
+            return [] if index is None else [(index, step_info)]
+
+        plan_data = self.planning_tool.plans[self.active_plan_id]
+        steps = plan_data.get("steps", [])
+
+        # The dependency structure only changes when the steps themselves do
+        # (initial planning or an agent editing the plan); memoize it keyed
+        # on the steps tuple so recurring plans skip the parse entirely
+        steps_key = tuple(steps)
+        cached = self._plan_deps_cache
+        if cached is not None and cached[0] == steps_key:
+            deps_per_step, has_deps = cached[1], cached[2]
+        else:
+            deps_per_step = tuple(_parse_depends_on(step) for step in steps)
+            has_deps = any(deps_per_step)
+            self._plan_deps_cache = (steps_key, deps_per_step, has_deps)
+
+        if not has_deps:
+            index, step_info = await self._get_current_step_info()
+            return [] if index is None else [(index, step_info)]
+
+        step_statuses = plan_data.get("step_statuses", [])
+
+        # Single pass over the statuses: collect completed indices and the
+        # not-started candidates together instead of re-walking the full
+        # step list once per question
+        completed = set()
+        candidates = []
+        for i, step in enumerate(steps):
+            status = (
+                step_statuses[i]
+                if i < len(step_statuses)
+                else PlanStepStatus.NOT_STARTED.value
+            )
+            if status == PlanStepStatus.COMPLETED.value:
+                completed.add(i)
+            elif status in _ACTIVE_STATUSES:
+                # in_progress steps stay schedulable, matching the serial
+                # path: a step left in_progress by a failed round would
+                # otherwise never be retried and would strand its dependents
+                candidates.append((i, step, deps_per_step[i]))
+
+        ready = []
+        for i, step, deps in candidates:
+            if not all(dep in completed for dep in deps):
+                continue
+
+            await self._mark_step_in_progress(plan_data, step_statuses, i)
+            ready.append((i, _build_step_info(step)))
+
+        if candidates and not ready:
+            # Pending steps remain but none are schedulable: the markers form
+            # a cycle or reference a step that will never complete. Degrade to
+            # serial execution of the first pending step so the plan still
+            # makes progress instead of being silently finalized as complete.
+            index, step, deps = candidates[0]
+            logger.warning(
+                f"Unsatisfiable [depends_on] markers in plan {self.active_plan_id} "
+                f"(step {index} waiting on {list(deps)}); falling back to serial execution"
+            )
+            await self._mark_step_in_progress(plan_data, step_statuses, index)
+            return [(index, _build_step_info(step))]
+
+        return ready
+
+    async def _mark_step_in_progress(
+        self, plan_data: dict, step_statuses: list, index: int
+    ) -> None:
+        """Mark a step as in_progress, falling back to direct storage updates."""
+        try:
+            await self.planning_tool.execute(
+                command="mark_step",
+                plan_id=self.active_plan_id,
+                step_index=index,
+                step_status=PlanStepStatus.IN_PROGRESS.value,
+            )
+        except Exception as e:
+            logger.warning(f"Error marking step as in_progress: {e}")
+            # Update step status directly if needed
+            while len(step_statuses) <= index:
+                step_statuses.append(PlanStepStatus.NOT_STARTED.value)
+            step_statuses[index] = PlanStepStatus.IN_PROGRESS.value
+            plan_data["step_statuses"] = step_statuses
+
+        self._plan_dirty = True
 
     async def _get_current_step_info(self) -> tuple[Optional[int], Optional[dict]]:
         """
@@ -293,45 +611,19 @@ class PlanningFlow(BaseFlow):
             steps = plan_data.get("steps", [])
             step_statuses = plan_data.get("step_statuses", [])
 
-            # Find first non-completed step
-            for i, step in enumerate(steps):
+            # Find first non-completed step, resuming from the cursor since
+            # everything before it is already completed
+            for i in range(self._next_step_cursor, len(steps)):
+                step = steps[i]
                 if i >= len(step_statuses):
                     status = PlanStepStatus.NOT_STARTED.value
                 else:
                     status = step_statuses[i]
 
-                if status in PlanStepStatus.get_active_statuses():
-                    # Extract step type/category if available
-                    step_info = {"text": step}
-
-                    # Try to extract step type from the text (e.g., [SEARCH] or [CODE])
-                    import re
-
-                    type_match = re.search(r"\[([A-Z_]+)\]", step)
-                    if type_match:
-                        step_info["type"] = type_match.group(1).lower()
-
+                if status in _ACTIVE_STATUSES:
                     # Mark current step as in_progress
-                    try:
-                        await self.planning_tool.execute(
-                            command="mark_step",
-                            plan_id=self.active_plan_id,
-                            step_index=i,
-                            step_status=PlanStepStatus.IN_PROGRESS.value,
-                        )
-                    except Exception as e:
-                        logger.warning(f"Error marking step as in_progress: {e}")
-                        # Update step status directly if needed
-                        if i < len(step_statuses):
-                            step_statuses[i] = PlanStepStatus.IN_PROGRESS.value
-                        else:
-                            while len(step_statuses) < i:
-                                step_statuses.append(PlanStepStatus.NOT_STARTED.value)
-                            step_statuses.append(PlanStepStatus.IN_PROGRESS.value)
-
-                        plan_data["step_statuses"] = step_statuses
-
-                    return i, step_info
+                    await self._mark_step_in_progress(plan_data, step_statuses, i)
+                    return i, _build_step_info(step)
 
             return None, None  # No active step found
 
@@ -339,38 +631,64 @@ class PlanningFlow(BaseFlow):
             logger.warning(f"Error finding current step index: {e}")
             return None, None
 
-    async def _execute_step(self, executor: BaseAgent, step_info: dict) -> str:
-        """Execute the current step with the specified agent using agent.run()."""
+    async def _execute_step(
+        self, executor: BaseAgent, step_info: dict, step_index: Optional[int] = None
+    ) -> str:
+        """Execute a step with the specified agent using agent.run()."""
+        if step_index is None:
+            step_index = self.current_step_index
+
         # Prepare context for the agent with current plan status
         plan_status = await self._get_plan_text()
-        step_text = step_info.get("text", f"Step {self.current_step_index}")
-
-        # Create a prompt for the agent to execute the current step
-        step_prompt = f"""
-        CURRENT PLAN STATUS:
-        {plan_status}
+        step_text = step_info.get("text", f"Step {step_index}")
 
+        # Stable prefix first, per-step delta last, so sibling step calls
+        # within one plan version share a byte-identical prompt prefix and
+        # the provider's KV/prefix cache can be reused across them
+        step_prompt = self._build_step_prompt_prefix(plan_status) + (
+            f"""
         YOUR CURRENT TASK:
-        You are now working on step {self.current_step_index}: "{step_text}"
-
-        Please only execute this current step using the appropriate tools. When you're done, provide a summary of what you accomplished.
+        You are now working on step {step_index}: "{step_text}"
         """
+        )
 
         # Use agent.run() to execute the step
         try:
             step_result = await executor.run(step_prompt)
 
             # Mark the step as completed after successful execution
-            await self._mark_step_completed()
+            await self._mark_step_completed(step_index)
 
             return step_result
         except Exception as e:
-            logger.error(f"Error executing step {self.current_step_index}: {e}")
-            return f"Error executing step {self.current_step_index}: {str(e)}"
+            logger.error(f"Error executing step {step_index}: {e}")
+            return f"Error executing step {step_index}: {str(e)}"
+
+    def _build_step_prompt_prefix(self, plan_status: str) -> str:
+        """Build the shared, stable prefix of the per-step prompt.
+
+        Memoized on the rendered plan text so every step executed against the
+        same plan version reuses the exact same prefix string; only the
+        "current task" suffix changes between sibling steps.
+        """
+        cached = self._step_prefix_cache
+        if cached is not None and cached[0] == plan_status:
+            return cached[1]
+
+        prefix = f"""
+        CURRENT PLAN STATUS:
+        {plan_status}
 
-    async def _mark_step_completed(self) -> None:
-        """Mark the current step as completed."""
-        if self.current_step_index is None:
+        Please only execute the current step below using the appropriate tools. When you're done, provide a summary of what you accomplished.
+        """
+        self._step_prefix_cache = (plan_status, prefix)
+        return prefix
+
+    async def _mark_step_completed(self, step_index: Optional[int] = None) -> None:
+        """Mark the given step (default: current step) as completed."""
+        if step_index is None:
+            step_index = self.current_step_index
+        if step_index is None:
             return
 
         try:
@@ -378,11 +696,11 @@ class PlanningFlow(BaseFlow):
             await self.planning_tool.execute(
                 command="mark_step",
                 plan_id=self.active_plan_id,
-                step_index=self.current_step_index,
+                step_index=step_index,
                 step_status=PlanStepStatus.COMPLETED.value,
             )
             logger.info(
-                f"Marked step {self.current_step_index} as completed in plan {self.active_plan_id}"
+                f"Marked step {step_index} as completed in plan {self.active_plan_id}"
             )
         except Exception as e:
             logger.warning(f"Failed to update plan status: {e}")
@@ -392,20 +710,37 @@ class PlanningFlow(BaseFlow):
                 step_statuses = plan_data.get("step_statuses", [])
 
                 # Ensure the step_statuses list is long enough
-                while len(step_statuses) <= self.current_step_index:
+                while len(step_statuses) <= step_index:
                     step_statuses.append(PlanStepStatus.NOT_STARTED.value)
 
                 # Update the status
-                step_statuses[self.current_step_index] = PlanStepStatus.COMPLETED.value
+                step_statuses[step_index] = PlanStepStatus.COMPLETED.value
                 plan_data["step_statuses"] = step_statuses
 
+        self._plan_dirty = True
+        self._next_step_cursor = max(self._next_step_cursor, step_index + 1)
+
     async def _get_plan_text(self) -> str:
-        """Get the current plan as formatted text."""
+        """Get the current plan as formatted text.
+
+        The rendered text is cached and only re-generated after the plan is
+        mutated (create/mark_step), which marks the cache dirty.
+        """
+        if not self._plan_dirty and self._plan_text_cache is not None:
+            return self._plan_text_cache
+
         try:
-            result = await self.planning_tool.execute(
-                command="get", plan_id=self.active_plan_id
-            )
-            return result.output if hasattr(result, "output") else str(result)
+            if self.active_plan_id in self.planning_tool.plans:
+                # Render directly from storage, skipping the async tool round-trip
+                plan_text = self._generate_plan_text_from_storage()
+            else:
+                result = await self.planning_tool.execute(
+                    command="get", plan_id=self.active_plan_id
+                )
+                plan_text = result.output if hasattr(result, "output") else str(result)
+            self._plan_text_cache = plan_text
+            self._plan_dirty = False
+            return plan_text
         except Exception as e:
             logger.error(f"Error getting plan: {e}")
             return self._generate_plan_text_from_storage()
@@ -423,53 +758,62 @@ class PlanningFlow(BaseFlow):
             step_notes = plan_data.get("step_notes", [])
 
             # Ensure step_statuses and step_notes match the number of steps
-            while len(step_statuses) < len(steps):
-                step_statuses.append(PlanStepStatus.NOT_STARTED.value)
-            while len(step_notes) < len(steps):
-                step_notes.append("")
+            step_statuses += [PlanStepStatus.NOT_STARTED.value] * (
+                len(steps) - len(step_statuses)
+            )
+            step_notes += [""] * (len(steps) - len(step_notes))
 
             # Count steps by status
-            status_counts = {status: 0 for status in PlanStepStatus.get_all_statuses()}
-
-            for status in step_statuses:
-                if status in status_counts:
-                    status_counts[status] += 1
+            counts = Counter(step_statuses)
+            status_counts = {status: counts.get(status, 0) for status in _ALL_STATUSES}
 
             completed = status_counts[PlanStepStatus.COMPLETED.value]
             total = len(steps)
             progress = (completed / total) * 100 if total > 0 else 0
 
-            plan_text = f"Plan: {title} (ID: {self.active_plan_id})\n"
-            plan_text += "=" * len(plan_text) + "\n\n"
-
-            plan_text += (
-                f"Progress: {completed}/{total} steps completed ({progress:.1f}%)\n"
-            )
-            plan_text += f"Status: {status_counts[PlanStepStatus.COMPLETED.value]} completed, {status_counts[PlanStepStatus.IN_PROGRESS.value]} in progress, "
-            plan_text += f"{status_counts[PlanStepStatus.BLOCKED.value]} blocked, {status_counts[PlanStepStatus.NOT_STARTED.value]} not started\n\n"
-            plan_text += "Steps:\n"
-
-            status_marks = PlanStepStatus.get_status_marks()
-
+            # Collect lines and join once; repeated str += is quadratic in the
+            # total text length for long plans
+            header = f"Plan: {title} (ID: {self.active_plan_id})"
+            parts = [
+                header,
+                "=" * (len(header) + 1),
+                "",
+                f"Progress: {completed}/{total} steps completed ({progress:.1f}%)",
+                f"Status: {status_counts[PlanStepStatus.COMPLETED.value]} completed, {status_counts[PlanStepStatus.IN_PROGRESS.value]} in progress, "
+                f"{status_counts[PlanStepStatus.BLOCKED.value]} blocked, {status_counts[PlanStepStatus.NOT_STARTED.value]} not started",
+                "",
+                "Steps:",
+            ]
+
+            status_marks = _STATUS_MARKS
+
+            # 0-based numbering, matching the planning tool's `get` output and
+            # the step_index interpolated into step prompts
             for i, (step, status, notes) in enumerate(
-                zip(steps, step_statuses, step_notes), start=1
+                zip(steps, step_statuses, step_notes)
             ):
                 # Use status marks to indicate step status
                 status_mark = status_marks.get(
                     status, status_marks[PlanStepStatus.NOT_STARTED.value]
                 )
 
-                plan_text += f"{i}. {status_mark} {step}\n"
+                parts.append(f"{i}. {status_mark} {step}")
                 if notes:
-                    plan_text += f"   Notes: {notes}\n"
+                    parts.append(f"   Notes: {notes}")
 
-            return plan_text
+            parts.append("")  # keep the trailing newline
+            return "\n".join(parts)
         except Exception as e:
             logger.error(f"Error generating plan text from storage: {e}")
             return f"Error: Unable to retrieve plan with ID {self.active_plan_id}"
 
     async def _finalize_plan(self) -> str:
         """Finalize the plan and provide a summary using the flow's LLM directly."""
+        # Nothing to summarize for missing or empty plans; skip the LLM call
+        plan_data = self.planning_tool.plans.get(self.active_plan_id)
+        if not plan_data or not plan_data.get("steps"):
+            return "Plan completed: no steps to summarize."
+
         plan_text = await self._get_plan_text()
 
         # Create a summary using the flow's LLM directly
@@ -509,7 +853,7 @@ class PlanningFlow(BaseFlow):
 
     async def initialize_mcp_servers(self) -> None:
         """Initialize connections to configured MCP servers."""
-        for server_id, server_config in config.mcp_config.servers.items():
+        async def _connect_one(server_id, server_config) -> None:
             try:
                 if server_config.type == "sse":
                     if server_config.url:
@@ -541,6 +885,13 @@ class PlanningFlow(BaseFlow):
             except Exception as e:
                 logger.error(f"Failed to connect to MCP server {server_id}: {e}")
 
+        # 逐个建立连接：MCP SDK 的传输上下文由 anyio 取消作用域管理，
+        # 必须在进入它的任务中退出。放进 gather 的临时任务里建连会导致
+        # cleanup 阶段从调用方任务关闭 AsyncExitStack 时报
+        # "Attempted to exit cancel scope in a different task" 并泄漏连接
+        for server_id, server_config in config.mcp_config.servers.items():
+            await _connect_one(server_id, server_config)
+
     async def connect_mcp_server(
         self,
         server_url: str,
@@ -551,20 +902,28 @@ class PlanningFlow(BaseFlow):
         """Connect to an MCP server and add its tools."""
         if mcp_type == "stdio":
             await self.mcp_clients.connect_stdio(server_url, mcp_args or [], server_id)
-            self.connected_servers[server_id or server_url] = server_url
         elif mcp_type == "sse":
             await self.mcp_clients.connect_sse(server_url, server_id)
         elif mcp_type == "streamable_http":
             await self.mcp_clients.connect_streamable_http(server_url, server_id)
         else:
             raise ValueError(f"Unsupported MCP type: {mcp_type}")
+
+        # Update available tools with only the new tools from this server;
+        # serialize registration since connects may run concurrently
+        if self._mcp_setup_lock is None:
+            self._mcp_setup_lock = asyncio.Lock()
+        async with self._mcp_setup_lock:
+            # Record the connection for every transport type, not just stdio
             self.connected_servers[server_id or server_url] = server_url
 
-        # Update available tools with only the new tools from this server
-        new_tools = [
-            tool for tool in self.mcp_clients.tools if tool.server_id == server_id
-        ]
-        self.available_tools.add_tools(*new_tools)
+            new_tools = [
+                tool for tool in self.mcp_clients.tools if tool.server_id == server_id
+            ]
+            self.available_tools.add_tools(*new_tools)
+
+            # Tool catalog changed; force a refresh on next listing
+            self._mcp_tools_cache = None
 
     async def disconnect_mcp_server(self, server_id: str = "") -> None:
         """Disconnect from an MCP server and remove its tools."""
@@ -574,14 +933,18 @@ class PlanningFlow(BaseFlow):
         else:
             self.connected_servers.clear()
 
-        # Rebuild available tools without the disconnected server's tools
-        base_tools = [
+        # Drop only the disconnected server's tools instead of rebuilding the
+        # whole collection
+        to_remove = [
             tool
             for tool in self.available_tools.tools
-            if not isinstance(tool, MCPClientTool)
+            if isinstance(tool, MCPClientTool)
+            and (not server_id or tool.server_id == server_id)
         ]
-        self.available_tools = ToolCollection(*base_tools)
-        self.available_tools.add_tools(*self.mcp_clients.tools)
+        self.available_tools.remove_tools(*to_remove)
+
+        # Tool catalog changed; force a refresh on next listing
+        self._mcp_tools_cache = None
 
     async def cleanup(self):
         """Clean up Dispatcher agent resources."""
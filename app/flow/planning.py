@@ -1,5 +1,7 @@
 import json
+import re
 import time
+from collections import Counter
 from enum import Enum
 from typing import Dict, List, Optional, Union
 
@@ -12,6 +14,10 @@ from app.logger import logger
 from app.schema import AgentState, Message, ToolChoice
 from app.tool import PlanningTool
 
+# Matches step type markers like [SEARCH] or [CODE] in step text; compiled
+# once at import instead of on every step lookup
+_STEP_TYPE_RE = re.compile(r"\[([A-Z_]+)\]")
+
 
 class PlanStepStatus(str, Enum):
     """Enum class defining possible statuses of a plan step"""
@@ -22,24 +28,33 @@ class PlanStepStatus(str, Enum):
     BLOCKED = "blocked"
 
     @classmethod
-    def get_all_statuses(cls) -> list[str]:
-        """Return a list of all possible step status values"""
-        return [status.value for status in cls]
+    def get_all_statuses(cls) -> tuple[str, ...]:
+        """Return all possible step status values"""
+        return _ALL_STATUSES
 
     @classmethod
-    def get_active_statuses(cls) -> list[str]:
-        """Return a list of values representing active statuses (not started or in progress)"""
-        return [cls.NOT_STARTED.value, cls.IN_PROGRESS.value]
+    def get_active_statuses(cls) -> frozenset[str]:
+        """Return the set of active statuses (not started or in progress)"""
+        return _ACTIVE_STATUSES
 
     @classmethod
     def get_status_marks(cls) -> Dict[str, str]:
         """Return a mapping of statuses to their marker symbols"""
-        return {
-            cls.COMPLETED.value: "[✓]",
-            cls.IN_PROGRESS.value: "[→]",
-            cls.BLOCKED.value: "[!]",
-            cls.NOT_STARTED.value: "[ ]",
-        }
+        return _STATUS_MARKS
+
+
+# Computed once at import time so per-step membership checks reuse the same
+# containers instead of rebuilding a fresh list/dict on every call
+_ALL_STATUSES = tuple(status.value for status in PlanStepStatus)
+_ACTIVE_STATUSES = frozenset(
+    (PlanStepStatus.NOT_STARTED.value, PlanStepStatus.IN_PROGRESS.value)
+)
+_STATUS_MARKS = {
+    PlanStepStatus.COMPLETED.value: "[✓]",
+    PlanStepStatus.IN_PROGRESS.value: "[→]",
+    PlanStepStatus.BLOCKED.value: "[!]",
+    PlanStepStatus.NOT_STARTED.value: "[ ]",
+}
 
 
 class PlanningFlow(BaseFlow):
@@ -240,9 +255,7 @@ class PlanningFlow(BaseFlow):
                     step_info = {"text": step}
 
                     # Try to extract step type from the text (e.g., [SEARCH] or [CODE])
-                    import re
-
-                    type_match = re.search(r"\[([A-Z_]+)\]", step)
+                    type_match = _STEP_TYPE_RE.search(step)
                     if type_match:
                         step_info["type"] = type_match.group(1).lower()
 
@@ -358,31 +371,35 @@ class PlanningFlow(BaseFlow):
             step_notes = plan_data.get("step_notes", [])
 
             # Ensure step_statuses and step_notes match the number of steps
-            while len(step_statuses) < len(steps):
-                step_statuses.append(PlanStepStatus.NOT_STARTED.value)
-            while len(step_notes) < len(steps):
-                step_notes.append("")
-
-            # Count steps by status
-            status_counts = {status: 0 for status in PlanStepStatus.get_all_statuses()}
+            step_statuses += [PlanStepStatus.NOT_STARTED.value] * (
+                len(steps) - len(step_statuses)
+            )
+            step_notes += [""] * (len(steps) - len(step_notes))
 
-            for status in step_statuses:
-                if status in status_counts:
-                    status_counts[status] += 1
+            # Count steps by status in a single pass
+            counts = Counter(step_statuses)
+            status_counts = {
+                status: counts.get(status, 0)
+                for status in PlanStepStatus.get_all_statuses()
+            }
 
             completed = status_counts[PlanStepStatus.COMPLETED.value]
             total = len(steps)
             progress = (completed / total) * 100 if total > 0 else 0
 
-            plan_text = f"Plan: {title} (ID: {self.active_plan_id})\n"
-            plan_text += "=" * len(plan_text) + "\n\n"
-
-            plan_text += (
-                f"Progress: {completed}/{total} steps completed ({progress:.1f}%)\n"
-            )
-            plan_text += f"Status: {status_counts[PlanStepStatus.COMPLETED.value]} completed, {status_counts[PlanStepStatus.IN_PROGRESS.value]} in progress, "
-            plan_text += f"{status_counts[PlanStepStatus.BLOCKED.value]} blocked, {status_counts[PlanStepStatus.NOT_STARTED.value]} not started\n\n"
-            plan_text += "Steps:\n"
+            # Collect lines and join once; repeated str += re-copies the
+            # accumulated text on every append and is quadratic for long plans
+            header = f"Plan: {title} (ID: {self.active_plan_id})"
+            parts = [
+                header,
+                "=" * (len(header) + 1),
+                "",
+                f"Progress: {completed}/{total} steps completed ({progress:.1f}%)",
+                f"Status: {status_counts[PlanStepStatus.COMPLETED.value]} completed, {status_counts[PlanStepStatus.IN_PROGRESS.value]} in progress, "
+                f"{status_counts[PlanStepStatus.BLOCKED.value]} blocked, {status_counts[PlanStepStatus.NOT_STARTED.value]} not started",
+                "",
+                "Steps:",
+            ]
 
             status_marks = PlanStepStatus.get_status_marks()
 
@@ -394,11 +411,12 @@ class PlanningFlow(BaseFlow):
                     status, status_marks[PlanStepStatus.NOT_STARTED.value]
                 )
 
-                plan_text += f"{i}. {status_mark} {step}\n"
+                parts.append(f"{i}. {status_mark} {step}")
                 if notes:
-                    plan_text += f"   Notes: {notes}\n"
+                    parts.append(f"   Notes: {notes}")
 
-            return plan_text
+            parts.append("")  # keep the trailing newline
+            return "\n".join(parts)
         except Exception as e:
             logger.error(f"Error generating plan text from storage: {e}")
             return f"Error: Unable to retrieve plan with ID {self.active_plan_id}"
@@ -69,3 +69,27 @@ class ToolCollection:
         for tool in tools:
             self.add_tool(tool)
         return self
+
+    def remove_tool(self, tool: BaseTool):
+        """Remove a single tool from the collection.
+
+        If the tool is not part of the collection, it will be skipped and a warning will be logged.
+        """
+        if tool.name not in self.tool_map:
+            logger.warning(f"Tool {tool.name} not found in collection, skipping")
+            return self
+
+        self.tools = tuple(t for t in self.tools if t.name != tool.name)
+        del self.tool_map[tool.name]
+        return self
+
+    def remove_tools(self, *tools: BaseTool):
+        """Remove multiple tools from the collection in a single pass."""
+        names = {tool.name for tool in tools}
+        if not names:
+            return self
+
+        self.tools = tuple(t for t in self.tools if t.name not in names)
+        for name in names:
+            self.tool_map.pop(name, None)
+        return self
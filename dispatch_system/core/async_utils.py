@@ -0,0 +1,36 @@
+"""
+异步工具函数 - 调度系统共享的并发辅助
+"""
+
+import asyncio
+from typing import Awaitable, Iterable, List
+
+
+async def gather_bounded(
+    coros: Iterable[Awaitable], limit: int, return_exceptions: bool = False
+) -> List:
+    """带并发上限的 asyncio.gather
+
+    对下游（MCP服务器）扇出时限制同时在途的协程数，
+    避免无界并发耗尽连接或触发限流。
+
+    Args:
+        coros: 待执行的协程集合
+        limit: 同时在途的协程上限
+        return_exceptions: 同 asyncio.gather，为True时异常作为结果返回
+
+    Returns:
+        与输入顺序一一对应的结果列表
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _bounded(coro):
+        async with semaphore:
+            return await coro
+
+    return list(
+        await asyncio.gather(
+            *(_bounded(coro) for coro in coros),
+            return_exceptions=return_exceptions,
+        )
+    )
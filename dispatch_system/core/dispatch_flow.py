@@ -3,12 +3,29 @@ DispatchFlow - 基于OpenManus的调度流程
 """
 
 import asyncio
+import itertools
+import secrets
+import time
 from typing import Dict, Any, List, Optional
-import uuid
 from dataclasses import dataclass
 from dispatcher_agent import DispatcherAgent
 from mcp_bridge import MCPBridge
 
+# "处置警情"完整流程的固定计划模板：步骤描述和工具名在导入时构建一次，
+# 每次执行只需为各步骤补充警情相关的参数，不再逐字典重建整个计划
+_FULL_FLOW_TEMPLATE = (
+    {"description": "打开案发地周边监控", "tool_name": "getPOI"},
+    {"description": "查看管辖单位值班人员", "tool_name": "showQw"},
+    {"description": "联系值班人员", "tool_name": "callPhone"},
+)
+
+# 指令关键词到处理方法的路由表：导入时构建一次，新增指令只需加一行
+_COMMAND_ROUTES = (
+    (("监控", "摄像头"), "_execute_get_poi"),
+    (("值班", "人员"), "_execute_show_qw"),
+    (("电话", "联系"), "_execute_call_phone"),
+)
+
 @dataclass
 class EmergencyData:
     """警情数据"""
@@ -25,7 +42,27 @@ class DispatchFlow:
         """初始化调度流程"""
         self.mcp_bridge = MCPBridge()
         self.sessions: Dict[str, DispatcherAgent] = {}
+        # 会话ID = 进程级随机前缀 + 单调计数器：比 uuid4 字符串更短，
+        # 生成和哈希都更便宜，对调用方仍是普通字符串
+        self._session_prefix = secrets.token_hex(4)
+        self._session_counter = itertools.count(1)
+        # 会话空闲超时（秒）：调用方不再访问的会话在后续操作时被自动回收，
+        # 避免长驻服务里 sessions 字典无界增长
+        self.session_ttl: float = 3600.0
+        # 会话数硬上限：TTL 之外的兜底，短时间大量建会话也不会让内存无界增长
+        self.max_sessions: int = 1024
+        self._session_last_used: Dict[str, float] = {}
+        # 后台任务表：submit_command 提交的执行任务，poll_job 轮询；
+        # 完成后一直无人轮询的任务按 session_ttl 回收，防止无界增长
+        self._jobs: Dict[str, asyncio.Task] = {}
+        self._job_done_at: Dict[str, float] = {}
+        self._job_counter = itertools.count(1)
     
+    async def start(self):
+        """应用启动时预热：提前建立MCP连接，首个指令不再付握手开销"""
+        if hasattr(self.mcp_bridge, "ensure_connected"):
+            await self.mcp_bridge.ensure_connected()
+
     async def create_session(self, emergency_data: EmergencyData) -> str:
         """创建新的调度会话
         
@@ -35,14 +72,16 @@ class DispatchFlow:
         Returns:
             会话ID
         """
-        session_id = str(uuid.uuid4())
-        
+        self._reap_idle_sessions()
+        session_id = f"{self._session_prefix}-{next(self._session_counter):x}"
+
         # 创建新的调度代理
         agent = DispatcherAgent(session_id, self.mcp_bridge)
         success = await agent.initialize()
-        
+
         if success:
             self.sessions[session_id] = agent
+            self._session_last_used[session_id] = time.time()
             return session_id
         else:
             raise Exception("无法初始化调度代理")
@@ -58,21 +97,20 @@ class DispatchFlow:
         Returns:
             执行结果
         """
+        self._reap_idle_sessions()
         if session_id not in self.sessions:
             raise Exception(f"会话 {session_id} 不存在")
-        
+
         agent = self.sessions[session_id]
+        self._session_last_used[session_id] = time.time()
         
-        # 基于指令和警情数据生成工具调用
-        if "监控" in command or "摄像头" in command:
-            return await self._execute_get_poi(agent, emergency_data)
-        elif "值班" in command or "人员" in command:
-            return await self._execute_show_qw(agent, emergency_data)
-        elif "电话" in command or "联系" in command:
-            return await self._execute_call_phone(agent, emergency_data)
-        else:
-            # 默认执行完整流程
-            return await self._execute_full_flow(agent, emergency_data)
+        # 基于指令和警情数据生成工具调用：按路由表匹配关键词
+        for keywords, handler_name in _COMMAND_ROUTES:
+            if any(keyword in command for keyword in keywords):
+                return await getattr(self, handler_name)(agent, emergency_data)
+
+        # 默认执行完整流程
+        return await self._execute_full_flow(agent, emergency_data)
     
     async def _execute_get_poi(self, agent: DispatcherAgent, emergency_data: EmergencyData) -> Dict[str, Any]:
         """执行getPOI工具"""
@@ -128,30 +166,27 @@ class DispatchFlow:
     
     async def _execute_full_flow(self, agent: DispatcherAgent, emergency_data: EmergencyData) -> Dict[str, Any]:
         """执行完整调度流程"""
-        steps = [
-            {
-                "description": "打开案发地周边监控",
-                "tool_name": "getPOI",
-                "parameters": {
-                    "x_position": emergency_data.coordinates["x"],
-                    "y_position": emergency_data.coordinates["y"],
-                    "afdd": emergency_data.address
-                }
-            },
+        step_parameters = (
             {
-                "description": "查看管辖单位值班人员",
-                "tool_name": "showQw",
-                "parameters": {"gxdwdm": emergency_data.unit_code}
+                "x_position": emergency_data.coordinates["x"],
+                "y_position": emergency_data.coordinates["y"],
+                "afdd": emergency_data.address
             },
-            {
-                "description": "联系值班人员",
-                "tool_name": "callPhone",
-                "parameters": {"phone": "13800138000"}
-            }
+            {"gxdwdm": emergency_data.unit_code},
+            {"phone": "13800138000"}
+        )
+        steps = [
+            dict(template, parameters=parameters)
+            for template, parameters in zip(_FULL_FLOW_TEMPLATE, step_parameters)
         ]
-        
+
+
         agent.create_plan(steps)
-        results = await agent.execute_plan()
+        # getPOI 与 showQw 相互独立可并发执行；callPhone 依赖值班人员信息，放到下一层
+        if hasattr(agent, "execute_plan_parallel"):
+            results = await agent.execute_plan_parallel([[0, 1], [2]])
+        else:
+            results = await agent.execute_plan()
         
         return {
             "flow_type": "full",
@@ -162,21 +197,113 @@ class DispatchFlow:
             "session_id": agent.session_id
         }
     
+    async def submit_command(self, session_id: str, command: str, emergency_data: EmergencyData) -> Dict[str, Any]:
+        """提交指令并立即返回任务ID，执行在后台任务中进行
+
+        长耗时的MCP工具调用不再阻塞调用方；进度和结果用 poll_job 轮询。
+        execute_simple_command 仍保留原有的同步等待语义。
+
+        Args:
+            session_id: 会话ID
+            command: 用户指令
+            emergency_data: 警情数据
+
+        Returns:
+            含 job_id 的任务句柄
+        """
+        if session_id not in self.sessions:
+            raise Exception(f"会话 {session_id} 不存在")
+
+        job_id = f"{session_id}:job{next(self._job_counter):x}"
+        self._jobs[job_id] = asyncio.create_task(
+            self.execute_simple_command(session_id, command, emergency_data)
+        )
+        return {"job_id": job_id, "session_id": session_id}
+
+    def poll_job(self, job_id: str) -> Dict[str, Any]:
+        """查询后台任务进度；完成时返回执行结果并释放任务记录"""
+        task = self._jobs.get(job_id)
+        if task is None:
+            return {"job_id": job_id, "error": "任务不存在"}
+
+        if not task.done():
+            session_id = job_id.split(":", 1)[0]
+            return {
+                "job_id": job_id,
+                "done": False,
+                "status": self.get_session_status(session_id),
+            }
+
+        self._jobs.pop(job_id, None)
+        self._job_done_at.pop(job_id, None)
+        exc = task.exception()
+        if exc is not None:
+            return {"job_id": job_id, "done": True, "error": str(exc)}
+        return {"job_id": job_id, "done": True, "result": task.result()}
+
     def get_session_status(self, session_id: str) -> Dict[str, Any]:
         """获取会话状态"""
         if session_id not in self.sessions:
             return {"error": "会话不存在", "session_id": session_id}
         
         agent = self.sessions[session_id]
+        self._session_last_used[session_id] = time.time()
         return agent.get_plan_status()
-    
+
     def cleanup_session(self, session_id: str):
-        """清理会话"""
+        """清理会话，同时取消并丢弃该会话尚在途的后台任务"""
         if session_id in self.sessions:
             del self.sessions[session_id]
-    
+        self._session_last_used.pop(session_id, None)
+
+        prefix = f"{session_id}:"
+        for job_id in [job_id for job_id in self._jobs if job_id.startswith(prefix)]:
+            self._drop_job(job_id)
+
+    def _drop_job(self, job_id: str):
+        """丢弃一个后台任务：在途的取消，已完成的取回异常避免告警"""
+        task = self._jobs.pop(job_id)
+        self._job_done_at.pop(job_id, None)
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # 取回未被轮询的异常，避免 "Task exception was never retrieved"
+            task.exception()
+
+    def _reap_idle_sessions(self):
+        """回收空闲超时的会话，与 cleanup_session 一样释放代理引用"""
+        deadline = time.time() - self.session_ttl
+        expired = [
+            session_id
+            for session_id, last_used in self._session_last_used.items()
+            if last_used < deadline
+        ]
+        for session_id in expired:
+            self.sessions.pop(session_id, None)
+            self._session_last_used.pop(session_id, None)
+
+        # 回收完成后一直无人轮询的后台任务：首次发现完成时记下时间，
+        # 超过 session_ttl 仍未被 poll_job 取走就丢弃
+        now = time.time()
+        for job_id, task in list(self._jobs.items()):
+            if not task.done():
+                continue
+            done_at = self._job_done_at.setdefault(job_id, now)
+            if now - done_at >= self.session_ttl:
+                self._drop_job(job_id)
+
+        # 超出硬上限时按最久未使用顺序淘汰，直到回到上限以内
+        if len(self.sessions) > self.max_sessions:
+            overflow = len(self.sessions) - self.max_sessions
+            for session_id in sorted(
+                self._session_last_used, key=self._session_last_used.get
+            )[:overflow]:
+                self.sessions.pop(session_id, None)
+                self._session_last_used.pop(session_id, None)
+
     def list_sessions(self) -> List[str]:
         """列出所有活跃会话"""
+        self._reap_idle_sessions()
         return list(self.sessions.keys())
 
 # 全局调度流程实例
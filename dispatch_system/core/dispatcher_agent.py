@@ -3,12 +3,19 @@ DispatcherAgent - 支持真实MCP服务器的调度执行代理
 """
 
 import asyncio
+import sys
+import time
 from typing import Dict, Any, List, Optional
 import uuid
 from dataclasses import dataclass
-from real_mcp_bridge import RealMCPBridge, RealToolResult
+from real_mcp_bridge import RealMCPBridge, RealToolResult, real_mcp_bridge
 
-@dataclass
+# 状态集合常量：成员判断走 C 层 frozenset 查找，而不是每次新建列表线性扫描
+_TERMINAL_STEP_STATUSES = frozenset({"success", "failed"})
+_RUNNABLE_AGENT_STATUSES = frozenset({"ready", "running"})
+
+# slots=True：每计划成批创建的小对象，去掉实例 __dict__ 省内存、属性访问更快
+@dataclass(slots=True)
 class ExecutionStep:
     """执行步骤"""
     step_id: str
@@ -32,10 +39,17 @@ class RealDispatcherAgent:
             mcp_bridge: 真实MCP桥接实例
         """
         self.session_id = session_id
-        self.mcp_bridge = mcp_bridge or RealMCPBridge("http://localhost:4000/mcp")
+        # 缺省共享全局桥接实例：避免每个会话各建一条 MCP 连接和各自的工具缓存
+        self.mcp_bridge = mcp_bridge or real_mcp_bridge
         self.execution_steps: List[ExecutionStep] = []
         self.current_step_index = 0
         self.status = "initialized"  # initialized, connecting, ready, running, paused, completed, failed
+        # 步骤状态视图缓存: step_id -> ((status, result标识), 视图字典)
+        self._step_view_cache: Dict[str, tuple] = {}
+        # 步骤集合变更版本号 + 整体状态快照缓存：轮询远多于变更，
+        # 版本没动时 get_plan_status 直接返回上次的快照
+        self._steps_version = 0
+        self._plan_status_cache: Optional[tuple] = None
     
     async def initialize(self) -> bool:
         """初始化代理并连接MCP服务器"""
@@ -55,14 +69,20 @@ class RealDispatcherAgent:
             print(f"❌ 调度代理 {self.session_id} 连接异常: {e}")
             return False
     
+    async def _ensure_ready(self) -> bool:
+        """确保代理可执行：连接可用且状态就绪
+
+        在计划/调用入口检查一次，execute_step 不再逐步重查连接状态。
+        """
+        if self.status in _RUNNABLE_AGENT_STATUSES and self.mcp_bridge.is_connected():
+            return True
+        return await self.initialize()
+
     async def discover_tools(self) -> List[Dict[str, Any]]:
         """发现可用工具"""
-        if not self.mcp_bridge.is_connected():
-            await self.initialize()
-        
-        if not self.mcp_bridge.is_connected():
+        if not await self._ensure_ready():
             return []
-        
+
         return await self.mcp_bridge.list_tools()
     
     def create_plan(self, steps: List[Dict[str, Any]]) -> List[ExecutionStep]:
@@ -74,14 +94,16 @@ class RealDispatcherAgent:
         Returns:
             执行步骤列表
         """
-        import time
-        
         self.execution_steps = []
+        self._step_view_cache.clear()
+        self._steps_version += 1
         for i, step_data in enumerate(steps):
+            # step_id/tool_name 会反复作为字典键使用且取值集合很小，
+            # 驻留后字典查找走指针比较的快路径
             step = ExecutionStep(
-                step_id=f"{self.session_id}_step_{i+1}",
+                step_id=sys.intern(f"{self.session_id}_step_{i+1}"),
                 description=step_data.get("description", f"步骤 {i+1}"),
-                tool_name=step_data["tool_name"],
+                tool_name=sys.intern(step_data["tool_name"]),
                 parameters=step_data["parameters"],
                 created_at=time.time()
             )
@@ -90,54 +112,39 @@ class RealDispatcherAgent:
         return self.execution_steps
     
     async def execute_step(self, step: ExecutionStep) -> RealToolResult:
-        """执行单个步骤"""
-        import time
-        
-        if not self.mcp_bridge.is_connected():
-            success = await self.initialize()
-            if not success:
-                return RealToolResult(
-                    success=False,
-                    error="无法连接到MCP服务器",
-                    tool_name=step.tool_name,
-                    parameters=step.parameters
-                )
-        
+        """执行单个步骤
+
+        连接检查已由计划入口的 _ensure_ready 完成；call_tool 内部也会
+        按需重连，失败时返回携带错误的结果而不是抛异常。
+        """
+        self._start_step(step)
+
+        # call_tool 自带兜底异常处理、总是返回 RealToolResult，
+        # 这里不再套一层 try/except 把同样的错误重新包装一遍
+        result = await self.mcp_bridge.call_tool(step.tool_name, step.parameters)
+
+        self._finish_step(step, result)
+        return result
+
+    def _start_step(self, step: ExecutionStep) -> None:
+        """步骤开始的状态簿记：一处集中写入并递增一次版本号"""
         step.status = "running"
         step.started_at = time.time()
-        
-        try:
-            result = await self.mcp_bridge.call_tool(
-                step.tool_name,
-                step.parameters
-            )
-            
-            step.result = result
-            step.status = "success" if result.success else "failed"
-            step.completed_at = time.time()
-            
-            return result
-            
-        except Exception as e:
-            step.status = "failed"
-            step.result = RealToolResult(
-                success=False,
-                error=str(e),
-                tool_name=step.tool_name,
-                parameters=step.parameters
-            )
-            step.completed_at = time.time()
-            return step.result
+        self._steps_version += 1
+
+    def _finish_step(self, step: ExecutionStep, result: RealToolResult) -> None:
+        """步骤结束的状态簿记：一处集中写入并递增一次版本号"""
+        step.result = result
+        step.status = "success" if result.success else "failed"
+        step.completed_at = time.time()
+        self._steps_version += 1
     
     async def execute_plan(self) -> List[RealToolResult]:
         """顺序执行整个计划"""
-        if self.status not in ["ready", "running"]:
-            await self.initialize()
-        
-        if not self.mcp_bridge.is_connected():
+        if not await self._ensure_ready():
             self.status = "failed"
             return []
-        
+
         self.status = "running"
         results = []
         
@@ -162,57 +169,179 @@ class RealDispatcherAgent:
             
         return results
     
+    async def execute_plan_parallel(self, layers: Optional[List[List[int]]] = None) -> List[RealToolResult]:
+        """按依赖分层并发执行计划
+
+        Args:
+            layers: 步骤索引分层，同层步骤相互独立、并发执行，
+                    下一层在上一层全部完成后开始；缺省时每步一层（等价于顺序执行）
+
+        Returns:
+            按步骤索引排序的执行结果列表
+        """
+        if not await self._ensure_ready():
+            self.status = "failed"
+            return []
+
+        if layers is None:
+            layers = [[i] for i in range(len(self.execution_steps))]
+
+        self.status = "running"
+        results: Dict[int, RealToolResult] = {}
+
+        try:
+            for layer in layers:
+                if self.status == "paused":
+                    break
+
+                self.current_step_index = layer[0]
+                layer_results = await asyncio.gather(
+                    *(self.execute_step(self.execution_steps[i]) for i in layer)
+                )
+                for i, result in zip(layer, layer_results):
+                    results[i] = result
+
+                if not all(result.success for result in layer_results):
+                    self.status = "failed"
+                    break
+
+            if self.status == "running":
+                self.status = "completed"
+
+        except Exception as e:
+            self.status = "failed"
+
+        return [results[i] for i in sorted(results)]
+
+    async def execute_plan_dag(self, deps: Optional[Dict[int, List[int]]] = None) -> List[RealToolResult]:
+        """按依赖前沿并发执行计划
+
+        与固定分层的 execute_plan_parallel 不同，这里每完成一批步骤就重新
+        计算可执行前沿，依赖已全部完成的步骤立即并发启动，总耗时收敛到
+        关键路径而不是各层最慢步骤之和。
+
+        Args:
+            deps: 步骤索引 -> 依赖的步骤索引列表；未出现的步骤视为无依赖，
+                  缺省等价于全部步骤一次性并发
+
+        Returns:
+            按步骤索引排序的执行结果列表
+        """
+        if not await self._ensure_ready():
+            self.status = "failed"
+            return []
+
+        deps = deps or {}
+        pending = set(range(len(self.execution_steps)))
+        completed: set = set()
+        results: Dict[int, RealToolResult] = {}
+        self.status = "running"
+
+        try:
+            while pending and self.status == "running":
+                frontier = [
+                    i for i in pending
+                    if all(dep in completed for dep in deps.get(i, ()))
+                ]
+                if not frontier:
+                    # 依赖成环或指向失败步骤，前沿为空，无法继续推进
+                    self.status = "failed"
+                    break
+
+                frontier_results = await asyncio.gather(
+                    *(self.execute_step(self.execution_steps[i]) for i in frontier)
+                )
+                for i, result in zip(frontier, frontier_results):
+                    pending.discard(i)
+                    results[i] = result
+                    if result.success:
+                        completed.add(i)
+
+                if not all(result.success for result in frontier_results):
+                    self.status = "failed"
+                    break
+
+            if self.status == "running":
+                self.status = "completed"
+
+        except Exception as e:
+            self.status = "failed"
+
+        return [results[i] for i in sorted(results)]
+
     async def execute_single_tool(self, tool_name: str, parameters: Dict[str, Any]) -> RealToolResult:
-        """执行单个工具调用"""
-        if not self.mcp_bridge.is_connected():
-            await self.initialize()
-        
-        if not self.mcp_bridge.is_connected():
+        """执行单个工具调用
+
+        单工具调用不进入计划，无需构造一次性的 ExecutionStep 做状态跟踪，
+        直接透传桥接结果。
+        """
+        if not await self._ensure_ready():
             return RealToolResult(
                 success=False,
                 error="无法连接到MCP服务器",
                 tool_name=tool_name,
                 parameters=parameters
             )
-        
-        step = ExecutionStep(
-            step_id=f"{self.session_id}_single",
-            description=f"执行 {tool_name}",
-            tool_name=tool_name,
-            parameters=parameters
-        )
-        
-        return await self.execute_step(step)
+
+        return await self.mcp_bridge.call_tool(tool_name, parameters)
     
     def get_plan_status(self) -> Dict[str, Any]:
         """获取计划执行状态"""
+        cache_key = (
+            self._steps_version,
+            self.status,
+            self.current_step_index,
+            self.mcp_bridge.is_connected(),
+        )
+        if self._plan_status_cache is not None and self._plan_status_cache[0] == cache_key:
+            return self._plan_status_cache[1]
+
         total_steps = len(self.execution_steps)
-        completed_steps = sum(1 for step in self.execution_steps if step.status in ["success", "failed"])
-        success_steps = sum(1 for step in self.execution_steps if step.status == "success")
+        # 一趟遍历同时统计终态和成功步骤数
+        completed_steps = 0
+        success_steps = 0
+        for step in self.execution_steps:
+            if step.status in _TERMINAL_STEP_STATUSES:
+                completed_steps += 1
+                if step.status == "success":
+                    success_steps += 1
         
-        return {
+        snapshot = {
             "session_id": self.session_id,
             "status": self.status,
-            "connected": self.mcp_bridge.is_connected(),
+            "connected": cache_key[3],
             "total_steps": total_steps,
             "completed_steps": completed_steps,
             "success_steps": success_steps,
             "current_step_index": self.current_step_index,
-            "steps": [
-                {
-                    "step_id": step.step_id,
-                    "description": step.description,
-                    "tool_name": step.tool_name,
-                    "status": step.status,
-                    "result": {
-                        "success": step.result.success if step.result else None,
-                        "data": step.result.data if step.result else None,
-                        "error": step.result.error if step.result else None
-                    } if step.result else None
-                }
-                for step in self.execution_steps
-            ]
+            "steps": [self._step_view(step) for step in self.execution_steps]
         }
+        self._plan_status_cache = (cache_key, snapshot)
+        return snapshot
+
+    def _step_view(self, step: ExecutionStep) -> Dict[str, Any]:
+        """构建单个步骤的状态视图
+
+        状态轮询远比状态变化频繁，步骤状态/结果未变化时直接复用上次构建的字典。
+        """
+        key = (step.status, id(step.result))
+        cached = self._step_view_cache.get(step.step_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        view = {
+            "step_id": step.step_id,
+            "description": step.description,
+            "tool_name": step.tool_name,
+            "status": step.status,
+            "result": {
+                "success": step.result.success,
+                "data": step.result.data,
+                "error": step.result.error
+            } if step.result else None
+        }
+        self._step_view_cache[step.step_id] = (key, view)
+        return view
     
     async def cleanup(self):
         """清理资源"""
@@ -222,6 +351,7 @@ class RealDispatcherAgent:
     def reset(self):
         """重置代理状态"""
         self.execution_steps = []
+        self._step_view_cache.clear()
         self.current_step_index = 0
         self.status = "initialized"
 
@@ -273,4 +403,10 @@ async def test_real_dispatcher():
         await agent.cleanup()
 
 if __name__ == "__main__":
+    # uvloop 是可选加速项：装了就用，没装回落到标准事件循环
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(test_real_dispatcher())
\ No newline at end of file
@@ -3,18 +3,22 @@ MCP服务器集成 - 真实MCP工具封装
 """
 
 import asyncio
-import json
+import time
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 import sys
 import os
 
-# 添加父目录到路径
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# 添加父目录到路径；已在路径中时不重复插入，
+# 避免重复导入本模块时反复改写 sys.path 并使导入器缓存失效
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
 
 from app.tool.mcp import MCPClients
 
-@dataclass
+# slots=True：每次工具调用都会创建的小对象，去掉实例 __dict__ 省内存
+@dataclass(slots=True)
 class MCPResult:
     """MCP工具调用结果"""
     success: bool
@@ -27,16 +31,32 @@ class MCPResult:
 class MCPToolManager:
     """MCP工具管理器 - 连接真实MCP服务器"""
     
-    def __init__(self, server_url: str = "http://localhost:4000/mcp"):
+    def __init__(
+        self,
+        server_url: str = "http://localhost:4000/mcp",
+        max_concurrency: int = 32,
+        mcp_clients: Optional[MCPClients] = None,
+    ):
         """初始化MCP工具管理器
-        
+
         Args:
             server_url: MCP服务器URL
+            max_concurrency: 同时在途的工具调用上限
+            mcp_clients: 可选的共享MCP客户端；同进程多个管理器传同一实例
+                         即可复用底层HTTP连接，而不是各持一条socket
         """
         self.server_url = server_url
-        self.mcp_clients = MCPClients()
+        # 限制在途调用数：并发执行/多会话叠加时内存和连接压力有恒定上界
+        self._call_sem = asyncio.Semaphore(max_concurrency)
+        self.mcp_clients = mcp_clients or MCPClients()
         self.connected = False
+        # 串行化并发 connect：同一时刻只做一次握手，其余调用方等待复用结果
+        self._connect_lock = asyncio.Lock()
         self.tools: Dict[str, Dict[str, Any]] = {}
+        # 工具列表只在连接/断开时变化，缓存物化结果避免每次调用重新拷贝
+        self._tool_list_cache: Optional[List[Dict[str, Any]]] = None
+        # 工具名 -> 工具对象映射，连接时预解析，热路径免去 f-string 拼接和二次查找
+        self._tool_cache: Dict[str, Any] = {}
     
     async def connect(self) -> bool:
         """连接到MCP服务器"""
@@ -58,7 +78,14 @@ class MCPToolManager:
                 for tool in tools_response.tools
             }
             
+            self._tool_cache = {
+                tool.name: self.mcp_clients.tool_map[f"mcp_dispatch_mcp_server_{tool.name}"]
+                for tool in tools_response.tools
+                if f"mcp_dispatch_mcp_server_{tool.name}" in self.mcp_clients.tool_map
+            }
+
             self.connected = True
+            self._tool_list_cache = None
             return True
             
         except Exception as e:
@@ -66,12 +93,23 @@ class MCPToolManager:
             self.connected = False
             return False
     
+    async def ensure_connected(self) -> bool:
+        """确保连接可用；已连接时立即返回，并发调用只触发一次握手"""
+        if self.connected:
+            return True
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            return await self.connect()
+
     async def disconnect(self) -> bool:
         """断开MCP服务器连接"""
         try:
             await self.mcp_clients.disconnect("dispatch_mcp_server")
             self.connected = False
             self.tools.clear()
+            self._tool_cache.clear()
+            self._tool_list_cache = None
             return True
         except Exception as e:
             print(f"MCP断开失败: {e}")
@@ -79,7 +117,9 @@ class MCPToolManager:
     
     def get_tools(self) -> List[Dict[str, Any]]:
         """获取可用工具列表"""
-        return list(self.tools.values())
+        if self._tool_list_cache is None:
+            self._tool_list_cache = list(self.tools.values())
+        return self._tool_list_cache
     
     async def execute_tool(self, tool_name: str, parameters: Dict[str, Any]) -> MCPResult:
         """执行MCP工具
@@ -91,13 +131,11 @@ class MCPToolManager:
         Returns:
             执行结果
         """
-        import time
-        start_time = time.time()
-        
-        if not self.connected:
-            await self.connect()
-            if not self.connected:
-                return MCPResult(
+        # 用单调时钟测耗时，不受系统时间回拨影响，开销也更低
+        start_time = time.perf_counter()
+
+        if not await self.ensure_connected():
+            return MCPResult(
                     success=False,
                     error="无法连接到MCP服务器",
                     tool_name=tool_name,
@@ -105,23 +143,21 @@ class MCPToolManager:
                 )
         
         try:
-            # 构建完整工具名
-            full_tool_name = f"mcp_dispatch_mcp_server_{tool_name}"
-            
-            if full_tool_name not in self.mcp_clients.tool_map:
-                available_tools = list(self.mcp_clients.tool_map.keys())
+            # 获取工具（连接时已预解析）
+            tool = self._tool_cache.get(tool_name)
+            if tool is None:
                 return MCPResult(
                     success=False,
-                    error=f"工具 {tool_name} 不可用。可用工具: {[t.split('_')[-1] for t in available_tools]}",
+                    error=f"工具 {tool_name} 不可用。可用工具: {list(self._tool_cache.keys())}",
                     tool_name=tool_name,
                     parameters=parameters
                 )
-            
+
             # 执行工具
-            tool = self.mcp_clients.tool_map[full_tool_name]
-            result = await tool.execute(**parameters)
+            async with self._call_sem:
+                result = await tool.execute(**parameters)
             
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             
             if result.error:
                 return MCPResult(
@@ -146,7 +182,7 @@ class MCPToolManager:
                 error=f"工具执行异常: {str(e)}",
                 tool_name=tool_name,
                 parameters=parameters,
-                execution_time=time.time() - start_time
+                execution_time=time.perf_counter() - start_time
             )
     
     def is_connected(self) -> bool:
@@ -3,18 +3,23 @@
 """
 
 import asyncio
+import time
 from typing import Dict, Any, List, Optional
 import uuid
 from dataclasses import dataclass
 import sys
 import os
 
-# 添加父目录到路径以导入MCP客户端
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 添加父目录到路径以导入MCP客户端；已在路径中时不重复插入，
+# 避免重复导入本模块时反复改写 sys.path 并使导入器缓存失效
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
 
 from app.tool.mcp import MCPClients
 
-@dataclass
+# slots=True：每次工具调用都会创建的小对象，去掉实例 __dict__ 省内存
+@dataclass(slots=True)
 class RealToolResult:
     """真实工具调用结果"""
     success: bool
@@ -27,25 +32,49 @@ class RealToolResult:
 class RealMCPBridge:
     """真实MCP桥接类，连接真实MCP服务器"""
     
-    def __init__(self, server_url: str = "http://localhost:4000/mcp"):
+    def __init__(
+        self,
+        server_url: str = "http://localhost:4000/mcp",
+        max_concurrency: int = 32,
+        mcp_clients: Optional[MCPClients] = None,
+        connect_timeout: Optional[float] = None,
+    ):
         """初始化真实MCP桥接
-        
+
         Args:
             server_url: MCP服务器URL
+            max_concurrency: 同时在途的工具调用上限
+            mcp_clients: 可选的共享MCP客户端；同进程多个桥接传同一实例
+                         即可复用底层HTTP连接，而不是各持一条socket
+            connect_timeout: 建立连接的超时秒数；None表示使用客户端默认超时
         """
         self.server_url = server_url
-        self.mcp_clients = MCPClients()
+        self.connect_timeout = connect_timeout
+        # 限制在途调用数：并发执行/多会话叠加时内存和连接压力有恒定上界
+        self._call_sem = asyncio.Semaphore(max_concurrency)
+        self.mcp_clients = mcp_clients or MCPClients()
         self.session_tools: Dict[str, Dict[str, Any]] = {}
         self.connected = False
+        # 串行化并发 connect：同一时刻只做一次握手，其余调用方等待复用结果
+        self._connect_lock = asyncio.Lock()
+        # 工具列表只在连接/断开时变化，缓存物化结果避免每次调用重新拷贝
+        self._tool_list_cache: Optional[List[Dict[str, Any]]] = None
+        self._tool_names_cache: Optional[List[str]] = None
+        # 工具名 -> 工具对象映射，连接时预解析，热路径免去 f-string 拼接和二次查找
+        self._tool_cache: Dict[str, Any] = {}
     
     async def connect(self) -> bool:
         """连接到真实MCP服务器"""
         try:
             print(f"🔗 连接到MCP服务器: {self.server_url}")
-            await self.mcp_clients.connect_streamable_http(
+            connect_coro = self.mcp_clients.connect_streamable_http(
                 server_url=self.server_url,
                 server_id="dispatch_mcp_server"
             )
+            if self.connect_timeout is not None:
+                await asyncio.wait_for(connect_coro, self.connect_timeout)
+            else:
+                await connect_coro
             
             # 获取可用工具
             tools_response = await self.mcp_clients.list_tools()
@@ -59,7 +88,15 @@ class RealMCPBridge:
                 for tool in tools_response.tools
             }
             
+            self._tool_cache = {
+                tool.name: self.mcp_clients.tool_map[f"mcp_dispatch_mcp_server_{tool.name}"]
+                for tool in tools_response.tools
+                if f"mcp_dispatch_mcp_server_{tool.name}" in self.mcp_clients.tool_map
+            }
+
             self.connected = True
+            self._tool_list_cache = None
+            self._tool_names_cache = None
             print(f"✅ 已连接到MCP服务器，可用工具：{list(self.session_tools['default'].keys())}")
             return True
             
@@ -68,12 +105,24 @@ class RealMCPBridge:
             self.connected = False
             return False
     
+    async def ensure_connected(self) -> bool:
+        """确保连接可用；已连接时立即返回，并发调用只触发一次握手"""
+        if self.connected:
+            return True
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            return await self.connect()
+
     async def disconnect(self) -> bool:
         """断开与MCP服务器的连接"""
         try:
             await self.mcp_clients.disconnect("dispatch_mcp_server")
             self.connected = False
             self.session_tools.clear()
+            self._tool_cache.clear()
+            self._tool_list_cache = None
+            self._tool_names_cache = None
             print("🔗 已断开与MCP服务器的连接")
             return True
         except Exception as e:
@@ -82,13 +131,12 @@ class RealMCPBridge:
     
     async def list_tools(self) -> List[Dict[str, Any]]:
         """获取可用工具列表"""
-        if not self.connected:
-            await self.connect()
-        
-        if not self.connected:
+        if not await self.ensure_connected():
             return []
-        
-        return list(self.session_tools.get("default", {}).values())
+
+        if self._tool_list_cache is None:
+            self._tool_list_cache = list(self.session_tools.get("default", {}).values())
+        return self._tool_list_cache
     
     async def call_tool(self, tool_name: str, parameters: Dict[str, Any]) -> RealToolResult:
         """调用真实MCP工具
@@ -100,13 +148,10 @@ class RealMCPBridge:
         Returns:
             工具调用结果
         """
-        import time
-        start_time = time.time()
-        
-        if not self.connected:
-            await self.connect()
-        
-        if not self.connected:
+        # 用单调时钟测耗时，不受系统时间回拨影响，开销也更低
+        start_time = time.perf_counter()
+
+        if not await self.ensure_connected():
             return RealToolResult(
                 success=False,
                 error="无法连接到MCP服务器",
@@ -115,22 +160,21 @@ class RealMCPBridge:
             )
         
         try:
-            # 获取真实工具
-            full_tool_name = f"mcp_dispatch_mcp_server_{tool_name}"
-            if full_tool_name not in self.mcp_clients.tool_map:
-                available_tools = list(self.mcp_clients.tool_map.keys())
+            # 获取真实工具（连接时已预解析）
+            tool = self._tool_cache.get(tool_name)
+            if tool is None:
                 return RealToolResult(
                     success=False,
-                    error=f"工具 {tool_name} 不可用。可用工具: {available_tools}",
+                    error=f"工具 {tool_name} 不可用。可用工具: {list(self._tool_cache.keys())}",
                     tool_name=tool_name,
                     parameters=parameters
                 )
-            
+
             # 调用真实工具
-            tool = self.mcp_clients.tool_map[full_tool_name]
-            result = await tool.execute(**parameters)
+            async with self._call_sem:
+                result = await tool.execute(**parameters)
             
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             
             if result.error:
                 return RealToolResult(
@@ -155,15 +199,48 @@ class RealMCPBridge:
                 error=f"工具调用异常: {str(e)}",
                 tool_name=tool_name,
                 parameters=parameters,
-                execution_time=time.time() - start_time
+                execution_time=time.perf_counter() - start_time
             )
     
+    async def call_tools(self, calls: List[tuple]) -> List[RealToolResult]:
+        """批量调用工具
+
+        MCP 协议没有批量端点，这里把一组调用合并为一次连接检查和一轮
+        asyncio.gather：请求在同一批事件循环轮次内并发发出（受
+        max_concurrency 上限约束），而不是由调用方逐个 await。
+
+        Args:
+            calls: (tool_name, parameters) 二元组列表
+
+        Returns:
+            与 calls 顺序一一对应的结果列表
+        """
+        if not calls:
+            return []
+
+        if not await self.ensure_connected():
+            return [
+                RealToolResult(
+                    success=False,
+                    error="无法连接到MCP服务器",
+                    tool_name=tool_name,
+                    parameters=parameters
+                )
+                for tool_name, parameters in calls
+            ]
+
+        return list(await asyncio.gather(
+            *(self.call_tool(tool_name, parameters) for tool_name, parameters in calls)
+        ))
+
     def get_available_tools(self) -> List[str]:
         """获取可用工具名称列表"""
         if not self.connected:
             return []
-        
-        return list(self.session_tools.get("default", {}).keys())
+
+        if self._tool_names_cache is None:
+            self._tool_names_cache = list(self.session_tools.get("default", {}).keys())
+        return self._tool_names_cache
     
     def is_connected(self) -> bool:
         """检查连接状态"""
@@ -205,4 +282,10 @@ async def main():
     await test_real_mcp_connection()
 
 if __name__ == "__main__":
+    # uvloop 是可选加速项：装了就用，没装回落到标准事件循环
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""
+测试公共配置
+"""
+
+import asyncio
+
+import pytest
+
+# uvloop 为可选依赖：装有时异步测试在 libuv 循环上运行，
+# 每次 await 的调度开销更低；未安装则回退标准事件循环
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """pytest-asyncio 使用的事件循环策略"""
+    if uvloop is not None:
+        return uvloop.EventLoopPolicy()
+    return asyncio.DefaultEventLoopPolicy()
@@ -4,6 +4,7 @@
 
 import asyncio
 import json
+from async_utils import gather_bounded
 from dispatch_flow import DispatchFlow, EmergencyData
 
 async def demo_simple_command():
@@ -115,31 +116,36 @@ async def demo_multi_session():
         )
     ]
     
-    # 并发创建会话
-    sessions = []
-    for i, emergency in enumerate(emergencies):
-        session_id = await flow.create_session(emergency)
-        sessions.append((session_id, emergency, f"警情{i+1}"))
+    # 并发创建会话：各警情相互独立，建立耗时从各会话之和降为最大值；
+    # 并发上限防止大量警情同时涌入时压垮下游MCP服务器
+    session_ids = await gather_bounded(
+        (flow.create_session(emergency) for emergency in emergencies), limit=16
+    )
+    sessions = [
+        (session_id, emergency, f"警情{i+1}")
+        for i, (session_id, emergency) in enumerate(zip(session_ids, emergencies))
+    ]
+    for i, (session_id, _, _) in enumerate(sessions):
         print(f"🔑 创建会话{i+1}：{session_id}")
     
-    # 并发执行
-    tasks = []
-    for session_id, emergency, name in sessions:
-        task = flow.execute_simple_command(session_id, "处置警情", emergency)
-        tasks.append(task)
-    
-    results = await asyncio.gather(*tasks)
-    
+    # 并发执行：按完成顺序处理，最快的会话不必等最慢的才出结果
+    async def _dispatch(session_id, emergency, name):
+        result = await flow.execute_simple_command(session_id, "处置警情", emergency)
+        return session_id, name, result
+
+    tasks = [
+        asyncio.ensure_future(_dispatch(session_id, emergency, name))
+        for session_id, emergency, name in sessions
+    ]
+
     print(f"\n📊 并发执行结果：")
-    for i, (session_id, emergency, name) in enumerate(sessions):
-        result = results[i]
+    for future in asyncio.as_completed(tasks):
+        session_id, name, result = await future
         status = result.get('status', 'unknown') if isinstance(result, dict) else 'unknown'
         print(f"   {name}：{status} (会话：{session_id[-8:]})")
-    
-    # 清理所有会话
-    for session_id, _, _ in sessions:
+        # 完成即清理，提前释放会话状态
         flow.cleanup_session(session_id)
-    
+
     print(f"🧹 清理所有会话完成")
 
 async def main():
@@ -170,4 +176,8 @@ async def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # eager task factory：同步即可完成的协程（mock调用、缓存命中）
+    # 不再绕事件循环调度一圈（Python 3.12+）
+    with asyncio.Runner() as runner:
+        runner.get_loop().set_task_factory(asyncio.eager_task_factory)
+        runner.run(main())
\ No newline at end of file
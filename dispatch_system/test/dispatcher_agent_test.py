@@ -3,12 +3,15 @@ DispatcherAgent - 调度执行代理
 """
 
 import asyncio
+import time
 from typing import Dict, Any, List, Optional
 import uuid
 from dataclasses import dataclass
+from async_utils import gather_bounded
 from mcp_bridge import MCPBridge, ToolResult
 
-@dataclass
+# slots=True：每计划成批创建的小对象，去掉实例 __dict__ 省内存、属性访问更快
+@dataclass(slots=True)
 class ExecutionStep:
     """执行步骤"""
     step_id: str
@@ -20,6 +23,8 @@ class ExecutionStep:
     created_at: float = 0.0
     started_at: Optional[float] = None
     completed_at: Optional[float] = None
+    # 依赖的步骤索引列表；为空表示不声明依赖（计划整体保持顺序执行）
+    dependencies: Optional[List[int]] = None
 
 class DispatcherAgent:
     """调度执行代理"""
@@ -32,13 +37,21 @@ class DispatcherAgent:
             mcp_bridge: MCP桥接实例
         """
         self.session_id = session_id
-        self.mcp_bridge = mcp_bridge or MCPBridge()
+        # 缺省共享进程级桥接单例：避免每个会话各建一份客户端和工具缓存
+        self.mcp_bridge = mcp_bridge or MCPBridge.get_instance()
         self.execution_steps: List[ExecutionStep] = []
         self.current_step_index = 0
         self.status = "initialized"  # initialized, running, paused, completed, failed
-        
+        # 状态查询缓存：计数器和步骤视图在步骤状态变化时原地更新，
+        # get_plan_status 轮询不再每次全量重建
+        self._counts = {"completed": 0, "success": 0}
+        self._step_views: List[Dict[str, Any]] = []
+        self._view_by_id: Dict[str, Dict[str, Any]] = {}
+
     async def initialize(self) -> bool:
-        """初始化代理"""
+        """初始化代理；已就绪时直接返回，重复调用是 O(1)"""
+        if self.status == "ready":
+            return True
         try:
             await self.mcp_bridge.initialize_tools(self.session_id)
             self.status = "ready"
@@ -56,19 +69,30 @@ class DispatcherAgent:
         Returns:
             执行步骤列表
         """
-        import time
-        
         self.execution_steps = []
+        self._counts = {"completed": 0, "success": 0}
+        self._step_views = []
+        self._view_by_id = {}
         for i, step_data in enumerate(steps):
             step = ExecutionStep(
                 step_id=f"{self.session_id}_step_{i+1}",
                 description=step_data.get("description", f"步骤 {i+1}"),
                 tool_name=step_data["tool_name"],
                 parameters=step_data["parameters"],
-                created_at=time.time()
+                created_at=time.time(),
+                dependencies=step_data.get("dependencies")
             )
             self.execution_steps.append(step)
-        
+            view = {
+                "step_id": step.step_id,
+                "description": step.description,
+                "tool_name": step.tool_name,
+                "status": step.status,
+                "result": None
+            }
+            self._step_views.append(view)
+            self._view_by_id[step.step_id] = view
+
         return self.execution_steps
     
     async def execute_step(self, step: ExecutionStep) -> ToolResult:
@@ -80,24 +104,21 @@ class DispatcherAgent:
         Returns:
             执行结果
         """
-        import time
-        
         step.status = "running"
         step.started_at = time.time()
-        
+        self._update_step_view(step)
+
         try:
             result = await self.mcp_bridge.call_tool(
                 self.session_id,
                 step.tool_name,
                 step.parameters
             )
-            
+
             step.result = result
             step.status = "success" if result.success else "failed"
             step.completed_at = time.time()
-            
-            return result
-            
+
         except Exception as e:
             step.status = "failed"
             step.result = ToolResult(
@@ -107,73 +128,142 @@ class DispatcherAgent:
                 parameters=step.parameters
             )
             step.completed_at = time.time()
-            return step.result
+
+        self._update_step_view(step)
+        return step.result
+
+    def _update_step_view(self, step: ExecutionStep):
+        """步骤状态变化时原地更新视图和计数器"""
+        view = self._view_by_id.get(step.step_id)
+        if view is None:
+            # 不在计划内的临时步骤（execute_single_tool），不参与状态统计
+            return
+
+        previous = view["status"]
+        view["status"] = step.status
+        if step.status in ("success", "failed"):
+            view["result"] = {
+                "success": step.result.success,
+                "data": step.result.data,
+                "error": step.result.error
+            } if step.result else None
+            self._counts["completed"] += 1
+            if step.status == "success":
+                self._counts["success"] += 1
+        elif previous in ("success", "failed"):
+            # 步骤重跑（同一计划再次 execute_plan）：先退掉上一轮的终态
+            # 计数，保证 completed_steps 不会超过 total_steps
+            view["result"] = None
+            self._counts["completed"] -= 1
+            if previous == "success":
+                self._counts["success"] -= 1
     
-    async def execute_plan(self) -> List[ToolResult]:
-        """顺序执行整个计划
-        
+    async def execute_plan(self, max_concurrent: int = 8) -> List[ToolResult]:
+        """执行整个计划
+
+        步骤可通过 dependencies 声明依赖的步骤索引，依赖已全部完成的步骤
+        按"波"并发执行（I/O等待相互重叠），一波全部成功后才推进下一波；
+        没有任何步骤声明依赖时保持原有的严格顺序执行和失败即停语义。
+
+        Args:
+            max_concurrent: 单波内同时在途的步骤上限
+
         Returns:
-            所有步骤的执行结果
+            按步骤顺序排列的执行结果
         """
         if self.status != "ready":
             await self.initialize()
-        
+
         self.status = "running"
-        results = []
-        
+        results: Dict[int, ToolResult] = {}
+        has_dependencies = any(step.dependencies for step in self.execution_steps)
+
         try:
-            for i, step in enumerate(self.execution_steps):
-                if self.status == "paused":
-                    break
-                    
-                self.current_step_index = i
-                result = await self.execute_step(step)
-                results.append(result)
-                
-                if not result.success:
-                    self.status = "failed"
-                    break
-            
+            if not has_dependencies:
+                for i, step in enumerate(self.execution_steps):
+                    if self.status == "paused":
+                        break
+
+                    self.current_step_index = i
+                    result = await self.execute_step(step)
+                    results[i] = result
+
+                    if not result.success:
+                        self.status = "failed"
+                        break
+            else:
+                pending = set(range(len(self.execution_steps)))
+                completed = set()
+                while pending and self.status == "running":
+                    wave = [
+                        i for i in pending
+                        if all(
+                            dep in completed
+                            for dep in (self.execution_steps[i].dependencies or ())
+                        )
+                    ]
+                    if not wave:
+                        # 依赖成环或指向失败步骤，无法继续推进
+                        self.status = "failed"
+                        break
+
+                    self.current_step_index = wave[0]
+                    wave_results = await gather_bounded(
+                        (self.execute_step(self.execution_steps[i]) for i in wave),
+                        limit=max_concurrent,
+                        return_exceptions=True
+                    )
+                    wave_ok = True
+                    for i, result in zip(wave, wave_results):
+                        pending.discard(i)
+                        if isinstance(result, BaseException):
+                            step = self.execution_steps[i]
+                            result = ToolResult(
+                                success=False,
+                                error=str(result),
+                                tool_name=step.tool_name,
+                                parameters=step.parameters
+                            )
+                        results[i] = result
+                        if result.success:
+                            completed.add(i)
+                        else:
+                            wave_ok = False
+
+                    if not wave_ok:
+                        self.status = "failed"
+                        break
+
             if self.status == "running":
                 self.status = "completed"
-                
+
         except Exception as e:
             self.status = "failed"
-            
-        return results
+
+        return [results[i] for i in sorted(results)]
     
     def get_plan_status(self) -> Dict[str, Any]:
-        """获取计划执行状态"""
-        total_steps = len(self.execution_steps)
-        completed_steps = sum(1 for step in self.execution_steps if step.status in ["success", "failed"])
-        success_steps = sum(1 for step in self.execution_steps if step.status == "success")
-        
+        """获取计划执行状态
+
+        计数器和步骤视图由 execute_step 在状态变化时维护，
+        高频轮询不再逐步重扫、重建字典。
+        """
         return {
             "session_id": self.session_id,
             "status": self.status,
-            "total_steps": total_steps,
-            "completed_steps": completed_steps,
-            "success_steps": success_steps,
+            "total_steps": len(self.execution_steps),
+            "completed_steps": self._counts["completed"],
+            "success_steps": self._counts["success"],
             "current_step_index": self.current_step_index,
-            "steps": [
-                {
-                    "step_id": step.step_id,
-                    "description": step.description,
-                    "tool_name": step.tool_name,
-                    "status": step.status,
-                    "result": {
-                        "success": step.result.success if step.result else None,
-                        "data": step.result.data if step.result else None,
-                        "error": step.result.error if step.result else None
-                    } if step.result else None
-                }
-                for step in self.execution_steps
-            ]
+            "steps": self._step_views
         }
-    
+
     def reset(self):
         """重置代理状态"""
         self.execution_steps = []
+        self._counts = {"completed": 0, "success": 0}
+        self._step_views = []
+        self._view_by_id = {}
         self.current_step_index = 0
         self.status = "initialized"
     
@@ -187,8 +277,9 @@ class DispatcherAgent:
         Returns:
             执行结果
         """
-        await self.initialize()
-        
+        if self.status != "ready":
+            await self.initialize()
+
         step = ExecutionStep(
             step_id=f"{self.session_id}_single",
             description=f"执行 {tool_name}",
@@ -3,11 +3,13 @@ MCP桥接工具 - 连接调度系统与MCP工具
 """
 
 import asyncio
+import time
 from typing import Dict, Any, List, Optional
 import uuid
 from dataclasses import dataclass
 
-@dataclass
+# slots=True：每次工具调用都会创建的小对象，去掉实例 __dict__ 省内存
+@dataclass(slots=True)
 class ToolResult:
     """工具调用结果"""
     success: bool
@@ -19,7 +21,21 @@ class ToolResult:
 
 class MCPBridge:
     """MCP桥接类，管理工具调用和会话"""
-    
+
+    # 进程级单例，见 get_instance
+    _instance: Optional["MCPBridge"] = None
+
+    @classmethod
+    def get_instance(cls) -> "MCPBridge":
+        """返回进程级单例桥接
+
+        复用同一个底层客户端和会话工具缓存，避免每个调用方
+        各建一份连接/缓存。
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
     def __init__(self, client=None):
         """初始化桥接
         
@@ -33,6 +49,12 @@ class MCPBridge:
             self.client = client
         
         self.session_tools = {}  # 会话级工具缓存
+        # 工具映射对所有会话都相同，构建一次后按引用共享（只读视图）；
+        # 加锁保证并发首调用（如多会话并发创建）只构建一次模板
+        self._session_template: Optional[Dict[str, Any]] = None
+        self._template_lock = asyncio.Lock()
+        # 模板工具集合的签名，首次请求时物化一次
+        self._template_signature: Optional[frozenset] = None
     
     async def initialize_tools(self, session_id: str) -> List[Dict[str, Any]]:
         """为会话初始化可用工具
@@ -43,11 +65,20 @@ class MCPBridge:
         Returns:
             可用工具列表
         """
-        tools = self.client.list_tools()
-        self.session_tools[session_id] = {
-            tool["name"]: tool for tool in tools
-        }
-        return tools
+        # 已初始化过的会话直接返回缓存，不再重查客户端
+        cached = self.session_tools.get(session_id)
+        if cached is not None:
+            return list(cached.values())
+
+        if self._session_template is None:
+            async with self._template_lock:
+                if self._session_template is None:
+                    tools = self.client.list_tools()
+                    self._session_template = {
+                        tool["name"]: tool for tool in tools
+                    }
+        self.session_tools[session_id] = self._session_template
+        return list(self._session_template.values())
     
     async def call_tool(self, session_id: str, tool_name: str, parameters: Dict[str, Any]) -> ToolResult:
         """调用指定工具
@@ -60,46 +91,100 @@ class MCPBridge:
         Returns:
             工具调用结果
         """
-        import time
-        start_time = time.time()
-        
-        try:
-            # 验证工具是否存在
-            if session_id not in self.session_tools:
-                await self.initialize_tools(session_id)
-            
-            available_tools = self.session_tools[session_id]
-            if tool_name not in available_tools:
-                return ToolResult(
-                    success=False,
-                    error=f"会话 {session_id} 中工具 {tool_name} 不可用",
-                    tool_name=tool_name,
-                    parameters=parameters
-                )
-            
-            # 调用工具
-            result = await self.client.call_tool(tool_name, parameters)
-            
-            execution_time = time.time() - start_time
-            
+        # 会话须由调用方预先初始化（create_session/initialize_tools），
+        # 热路径不再为每次调用付一次"可能要初始化"的分支和字典双查
+        available_tools = self.session_tools.get(session_id)
+        if available_tools is None:
             return ToolResult(
-                success=result.success,
-                data=result.data,
-                error=result.error,
+                success=False,
+                error=f"会话 {session_id} 未初始化，请先调用 initialize_tools",
                 tool_name=tool_name,
-                parameters=parameters,
-                execution_time=execution_time
+                parameters=parameters
             )
-            
+
+        if tool_name not in available_tools:
+            return ToolResult(
+                success=False,
+                error=f"会话 {session_id} 中工具 {tool_name} 不可用",
+                tool_name=tool_name,
+                parameters=parameters
+            )
+
+        # 用单调时钟测耗时，不受系统时间回拨影响，开销也更低；
+        # try 只包住真正会抛异常的客户端调用，成功路径不付异常表开销
+        start_time = time.perf_counter()
+        try:
+            result = await self.client.call_tool(tool_name, parameters)
         except Exception as e:
             return ToolResult(
                 success=False,
                 error=f"工具调用异常: {str(e)}",
                 tool_name=tool_name,
                 parameters=parameters,
-                execution_time=time.time() - start_time
+                execution_time=time.perf_counter() - start_time
             )
+        execution_time = time.perf_counter() - start_time
+
+        return ToolResult(
+            success=result.success,
+            data=result.data,
+            error=result.error,
+            tool_name=tool_name,
+            parameters=parameters,
+            execution_time=execution_time
+        )
     
+    async def batch_call_tools(
+        self,
+        session_id: str,
+        calls: List[tuple],
+        max_concurrent: int = 8,
+        stop_on_error: bool = False
+    ) -> List["ToolResult"]:
+        """批量调用工具
+
+        把一组调用合并为一次会话初始化/工具名校验加一轮并发分发，
+        而不是由调用方逐个 await 各付一次往返。
+
+        Args:
+            session_id: 会话ID
+            calls: (tool_name, parameters) 二元组列表
+            max_concurrent: 同时在途的调用上限
+            stop_on_error: 为True时，任一工具名校验失败则整批不分发
+
+        Returns:
+            与 calls 顺序一一对应的结果列表
+        """
+        if not calls:
+            return []
+
+        # 会话初始化和工具名校验整批只做一次
+        if session_id not in self.session_tools:
+            await self.initialize_tools(session_id)
+        available_tools = self.session_tools[session_id]
+
+        invalid = [name for name, _ in calls if name not in available_tools]
+        if invalid and stop_on_error:
+            return [
+                ToolResult(
+                    success=False,
+                    error=f"批量调用中存在不可用工具: {invalid}",
+                    tool_name=tool_name,
+                    parameters=parameters
+                )
+                for tool_name, parameters in calls
+            ]
+
+        semaphore = asyncio.Semaphore(max_concurrent)
+
+        async def _one(tool_name: str, parameters: Dict[str, Any]) -> ToolResult:
+            async with semaphore:
+                return await self.call_tool(session_id, tool_name, parameters)
+
+        return list(await asyncio.gather(
+            *(_one(tool_name, parameters) for tool_name, parameters in calls)
+        ))
+
     def get_available_tools(self, session_id: str) -> List[str]:
         """获取会话可用工具列表
         
@@ -113,6 +198,27 @@ class MCPBridge:
             return list(self.session_tools[session_id].keys())
         return []
     
+    def tools_signature(self, session_id: str) -> frozenset:
+        """会话工具集合的签名，用于比较两个会话的工具是否一致
+
+        共享模板的会话直接返回同一个缓存的 frozenset，
+        比较时不必每次重建集合。
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            工具名的frozenset；未初始化的会话返回空集合
+        """
+        tools = self.session_tools.get(session_id)
+        if tools is None:
+            return frozenset()
+        if tools is self._session_template:
+            if self._template_signature is None:
+                self._template_signature = frozenset(tools)
+            return self._template_signature
+        return frozenset(tools)
+
     def get_tool_schema(self, session_id: str, tool_name: str) -> Optional[Dict[str, Any]]:
         """获取工具schema
         
@@ -128,4 +234,4 @@ class MCPBridge:
         return None
 
 # 全局桥接实例
-mcp_bridge = MCPBridge()
\ No newline at end of file
+mcp_bridge = MCPBridge.get_instance()
\ No newline at end of file
@@ -3,10 +3,12 @@ Mock MCP Client for testing dispatch system
 """
 
 import asyncio
+import random
 from typing import Dict, Any, List
 from dataclasses import dataclass
 
-@dataclass
+# slots=True：每次模拟调用都会创建的小对象，与真实桥接的结果类保持一致
+@dataclass(slots=True)
 class MockToolResult:
     """模拟工具调用结果"""
     success: bool
@@ -55,6 +57,21 @@ class MockMCPClient:
             }
         }
         
+        # 工具列表不可变，构建一次共享返回；每次 list_tools 不再新建列表
+        self._tools_list = tuple(self.tools.values())
+
+        # 独立的随机数实例：不跟 random 模块的全局实例争用，
+        # 需要可复现的压测时也便于单独设种子
+        self.success_rate = 0.9  # 90%成功率
+        self._rng = random.Random()
+
+        # 必填参数集合在初始化时预计算一次，调用时直接做集合差运算，
+        # 不再每次调用都从schema里逐层取值
+        self._required_params = {
+            name: frozenset(schema["input_schema"]["required"])
+            for name, schema in self.tools.items()
+        }
+
         self.mock_responses = {
             "getPOI": {
                 "success": {
@@ -102,11 +119,9 @@ class MockMCPClient:
                 error=f"工具 {tool_name} 不存在"
             )
         
-        # 验证参数
-        tool_schema = self.tools[tool_name]
-        required_params = tool_schema["input_schema"]["required"]
-        missing_params = [p for p in required_params if p not in parameters]
-        
+        # 验证参数（必填集合已在初始化时预计算）
+        missing_params = sorted(self._required_params[tool_name] - parameters.keys())
+
         if missing_params:
             return MockToolResult(
                 success=False,
@@ -115,10 +130,7 @@ class MockMCPClient:
             )
         
         # 模拟随机成功/失败
-        import random
-        success_rate = 0.9  # 90%成功率
-        
-        if random.random() < success_rate:
+        if self._rng.random() < self.success_rate:
             return MockToolResult(
                 success=True,
                 data=self.mock_responses[tool_name]["success"]
@@ -134,9 +146,9 @@ class MockMCPClient:
         """获取工具Schema"""
         return self.tools.get(tool_name, {})
     
-    def list_tools(self) -> List[Dict[str, Any]]:
-        """列出所有可用工具"""
-        return list(self.tools.values())
+    def list_tools(self) -> tuple:
+        """列出所有可用工具（共享的不可变元组）"""
+        return self._tools_list
 
 # 全局mock实例
 mock_mcp_client = MockMCPClient()
\ No newline at end of file
@@ -2,6 +2,7 @@
 单元测试：DispatchFlow完整流程测试
 """
 
+import pytest
 import asyncio
 import sys
 import os
@@ -11,41 +12,37 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from dispatch_flow import DispatchFlow, EmergencyData
 
+# 所有用例共享同一个流程实例：MCPBridge 和底层客户端只构建一次，
+# 各用例用完即清理自己的会话，相互不残留状态
+flow = DispatchFlow()
+
+# 各用例通用的警情数据，导入时构建一次
+_EMERGENCY = EmergencyData(
+    coordinates={"x": 116.3974, "y": 39.9093},
+    address="北京市朝阳区测试地址",
+    unit_code="110105",
+    emergency_type="测试警情"
+)
+
+@pytest.mark.asyncio
 async def test_create_session():
     """测试创建会话"""
-    flow = DispatchFlow()
-    
-    emergency_data = EmergencyData(
-        coordinates={"x": 116.3974, "y": 39.9093},
-        address="北京市朝阳区测试地址",
-        unit_code="110105",
-        emergency_type="测试警情"
-    )
-    
-    session_id = await flow.create_session(emergency_data)
-    
+    session_id = await flow.create_session(_EMERGENCY)
+
     assert session_id is not None
     assert len(session_id) > 0
     assert session_id in flow.list_sessions()
-    
+
     print(f"✅ 测试通过：创建会话 - {session_id}")
-    return session_id
+    flow.cleanup_session(session_id)
 
+@pytest.mark.asyncio
 async def test_simple_command_get_poi():
     """测试简单命令：打开监控"""
-    flow = DispatchFlow()
-    
-    emergency_data = EmergencyData(
-        coordinates={"x": 116.3974, "y": 39.9093},
-        address="北京市朝阳区测试地址",
-        unit_code="110105",
-        emergency_type="测试警情"
-    )
-    
-    session_id = await flow.create_session(emergency_data)
+    session_id = await flow.create_session(_EMERGENCY)
     
     # 测试"打开监控"命令
-    result = await flow.execute_simple_command(session_id, "打开监控", emergency_data)
+    result = await flow.execute_simple_command(session_id, "打开监控", _EMERGENCY)
     
     assert result["tool_name"] == "getPOI"
     assert result["session_id"] == session_id
@@ -55,43 +52,29 @@ async def test_simple_command_get_poi():
         print(f"   结果：{result['data'].get('message', '成功')}")
     else:
         print(f"   错误：{result['error']}")
+    flow.cleanup_session(session_id)
 
+@pytest.mark.asyncio
 async def test_simple_command_show_qw():
     """测试简单命令：查看值班人员"""
-    flow = DispatchFlow()
-    
-    emergency_data = EmergencyData(
-        coordinates={"x": 116.3974, "y": 39.9093},
-        address="北京市朝阳区测试地址",
-        unit_code="110105",
-        emergency_type="测试警情"
-    )
-    
-    session_id = await flow.create_session(emergency_data)
+    session_id = await flow.create_session(_EMERGENCY)
     
     # 测试"查看值班人员"命令
-    result = await flow.execute_simple_command(session_id, "查看值班人员", emergency_data)
+    result = await flow.execute_simple_command(session_id, "查看值班人员", _EMERGENCY)
     
     assert result["tool_name"] == "showQw"
     assert result["session_id"] == session_id
     
     print(f"✅ 测试通过：查看值班人员命令 - 成功：{result['success']}")
+    flow.cleanup_session(session_id)
 
+@pytest.mark.asyncio
 async def test_full_flow():
     """测试完整流程"""
-    flow = DispatchFlow()
-    
-    emergency_data = EmergencyData(
-        coordinates={"x": 116.3974, "y": 39.9093},
-        address="北京市朝阳区测试地址",
-        unit_code="110105",
-        emergency_type="测试警情"
-    )
-    
-    session_id = await flow.create_session(emergency_data)
+    session_id = await flow.create_session(_EMERGENCY)
     
     # 测试完整流程
-    result = await flow.execute_simple_command(session_id, "处置警情", emergency_data)
+    result = await flow.execute_simple_command(session_id, "处置警情", _EMERGENCY)
     
     assert result["flow_type"] == "full"
     assert result["total_steps"] == 3
@@ -100,22 +83,15 @@ async def test_full_flow():
     
     print(f"✅ 测试通过：完整流程 - 状态：{result['status']}")
     print(f"   总步骤：{result['total_steps']}, 完成：{result['completed_steps']}")
+    flow.cleanup_session(session_id)
 
+@pytest.mark.asyncio
 async def test_session_status():
     """测试会话状态"""
-    flow = DispatchFlow()
-    
-    emergency_data = EmergencyData(
-        coordinates={"x": 116.3974, "y": 39.9093},
-        address="北京市朝阳区测试地址",
-        unit_code="110105",
-        emergency_type="测试警情"
-    )
-    
-    session_id = await flow.create_session(emergency_data)
+    session_id = await flow.create_session(_EMERGENCY)
     
     # 执行一些操作
-    await flow.execute_simple_command(session_id, "打开监控", emergency_data)
+    await flow.execute_simple_command(session_id, "打开监控", _EMERGENCY)
     
     # 获取状态
     status = flow.get_session_status(session_id)
@@ -124,11 +100,11 @@ async def test_session_status():
     assert "total_steps" in status
     
     print("✅ 测试通过：会话状态获取")
+    flow.cleanup_session(session_id)
 
+@pytest.mark.asyncio
 async def test_multiple_sessions():
     """测试多会话并发"""
-    flow = DispatchFlow()
-    
     emergency_data1 = EmergencyData(
         coordinates={"x": 116.3974, "y": 39.9093},
         address="地址1",
@@ -144,8 +120,10 @@ async def test_multiple_sessions():
     )
     
     # 并发创建会话
-    session1 = await flow.create_session(emergency_data1)
-    session2 = await flow.create_session(emergency_data2)
+    session1, session2 = await asyncio.gather(
+        flow.create_session(emergency_data1),
+        flow.create_session(emergency_data2)
+    )
     
     assert session1 != session2
     assert len(flow.list_sessions()) == 2
@@ -156,26 +134,24 @@ async def test_multiple_sessions():
         flow.execute_simple_command(session2, "查看值班人员", emergency_data2)
     ]
     
-    results = await asyncio.gather(*tasks)
-    
+    # return_exceptions=True：一个会话失败不会连带取消另一个会话
+    # 已在途的调用，各会话的部分进展得以保留
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
     assert len(results) == 2
+    failures = [r for r in results if isinstance(r, BaseException)]
+    assert not failures, f"会话执行异常: {failures}"
     assert results[0]["session_id"] == session1
     assert results[1]["session_id"] == session2
     
     print("✅ 测试通过：多会话并发")
+    flow.cleanup_session(session1)
+    flow.cleanup_session(session2)
 
+@pytest.mark.asyncio
 async def test_session_cleanup():
     """测试会话清理"""
-    flow = DispatchFlow()
-    
-    emergency_data = EmergencyData(
-        coordinates={"x": 116.3974, "y": 39.9093},
-        address="北京市朝阳区测试地址",
-        unit_code="110105",
-        emergency_type="测试警情"
-    )
-    
-    session_id = await flow.create_session(emergency_data)
+    session_id = await flow.create_session(_EMERGENCY)
     
     # 清理会话
     flow.cleanup_session(session_id)
@@ -188,26 +164,52 @@ async def test_session_cleanup():
     
     print("✅ 测试通过：会话清理")
 
-async def main():
-    """运行所有测试"""
-    print("🧪 开始DispatchFlow完整流程测试...")
-    
-    try:
-        session_id = await test_create_session()
-        await test_simple_command_get_poi()
-        await test_simple_command_show_qw()
-        await test_full_flow()
-        await test_session_status()
-        await test_multiple_sessions()
-        await test_session_cleanup()
-        
-        print("\n🎉 所有DispatchFlow测试通过！调度系统已就绪")
-        
-    except Exception as e:
-        print(f"\n❌ 测试失败：{e}")
-        import traceback
-        traceback.print_exc()
-        raise
+@pytest.mark.asyncio
+async def test_submit_and_poll_job():
+    """测试后台任务：提交、轮询进行中、轮询结果、结果取走后消失"""
+    session_id = await flow.create_session(_EMERGENCY)
+
+    handle = await flow.submit_command(session_id, "打开监控", _EMERGENCY)
+    job_id = handle["job_id"]
+    assert handle["session_id"] == session_id
+
+    status = flow.poll_job(job_id)
+    if not status.get("done", False):
+        # 任务尚未完成：轮询返回进行中状态和会话进度
+        assert "status" in status
+        await asyncio.wait_for(flow._jobs[job_id], timeout=5)
+        status = flow.poll_job(job_id)
+
+    # 完成后的轮询带回执行结果（或异常转成的错误），并释放任务记录
+    assert status["done"] is True
+    assert "result" in status or "error" in status
+    assert job_id not in flow._jobs
+
+    # 结果已取走，再次轮询视为任务不存在
+    assert "error" in flow.poll_job(job_id)
+
+    flow.cleanup_session(session_id)
+
+@pytest.mark.asyncio
+async def test_submit_unknown_session():
+    """测试向不存在的会话提交任务"""
+    with pytest.raises(Exception):
+        await flow.submit_command("no-such-session", "打开监控", _EMERGENCY)
+
+@pytest.mark.asyncio
+async def test_cleanup_cancels_session_jobs():
+    """测试清理会话时取消并丢弃其后台任务"""
+    session_id = await flow.create_session(_EMERGENCY)
+    handle = await flow.submit_command(session_id, "处置警情", _EMERGENCY)
+    task = flow._jobs[handle["job_id"]]
+
+    flow.cleanup_session(session_id)
+
+    assert handle["job_id"] not in flow._jobs
+    # 取消在下一次事件循环迭代生效；已抢先完成的任务也应处于终态
+    await asyncio.sleep(0)
+    assert task.done()
+    assert "error" in flow.poll_job(handle["job_id"])
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -2,6 +2,7 @@
 单元测试：DispatcherAgent测试
 """
 
+import pytest
 import asyncio
 import sys
 import os
@@ -10,8 +11,35 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from dispatcher_agent import DispatcherAgent
-from mcp_bridge import MCPBridge
+from mcp_bridge import MCPBridge, ToolResult
 
+class _StubBridge:
+    """确定性桩桥接：按工具名返回预设成败，并记录调用完成顺序
+
+    波次/依赖语义的断言不能依赖 mock 客户端的随机成功率，
+    用桩桥接把每个工具的结果固定下来。
+    """
+
+    def __init__(self, fail_tools=()):
+        self.fail_tools = set(fail_tools)
+        self.finished_order = []
+
+    async def initialize_tools(self, session_id):
+        return []
+
+    async def call_tool(self, session_id, tool_name, parameters):
+        await asyncio.sleep(0)
+        self.finished_order.append(tool_name)
+        if tool_name in self.fail_tools:
+            return ToolResult(
+                success=False, error="桩：预设失败",
+                tool_name=tool_name, parameters=parameters
+            )
+        return ToolResult(
+            success=True, data={}, tool_name=tool_name, parameters=parameters
+        )
+
+@pytest.mark.asyncio
 async def test_dispatcher_initialization():
     """测试代理初始化"""
     session_id = "test-dispatch-001"
@@ -24,6 +52,7 @@ async def test_dispatcher_initialization():
     
     print("✅ 测试通过：代理初始化")
 
+@pytest.mark.asyncio
 async def test_create_plan():
     """测试创建执行计划"""
     session_id = "test-dispatch-002"
@@ -57,6 +86,7 @@ async def test_create_plan():
     
     print("✅ 测试通过：创建执行计划")
 
+@pytest.mark.asyncio
 async def test_execute_single_tool():
     """测试执行单个工具"""
     session_id = "test-dispatch-003"
@@ -76,6 +106,7 @@ async def test_execute_single_tool():
     
     print(f"✅ 测试通过：单个工具执行，执行时间：{result.execution_time:.3f}s")
 
+@pytest.mark.asyncio
 async def test_execute_plan():
     """测试执行完整计划"""
     session_id = "test-dispatch-004"
@@ -120,6 +151,7 @@ async def test_execute_plan():
     
     print(f"✅ 测试通过：完整计划执行，状态：{agent.status}，完成步骤：{len(results)}")
 
+@pytest.mark.asyncio
 async def test_get_plan_status():
     """测试获取计划状态"""
     session_id = "test-dispatch-005"
@@ -146,6 +178,7 @@ async def test_get_plan_status():
     
     print("✅ 测试通过：计划状态获取")
 
+@pytest.mark.asyncio
 async def test_session_isolation():
     """测试会话隔离"""
     session1 = "test-dispatch-006"
@@ -171,23 +204,78 @@ async def test_session_isolation():
     
     print("✅ 测试通过：会话隔离")
 
-async def main():
-    """运行所有测试"""
-    print("🧪 开始DispatcherAgent测试...")
-    
-    try:
-        await test_dispatcher_initialization()
-        await test_create_plan()
-        await test_execute_single_tool()
-        await test_execute_plan()
-        await test_get_plan_status()
-        await test_session_isolation()
-        
-        print("\n🎉 所有DispatcherAgent测试通过！")
-        
-    except Exception as e:
-        print(f"\n❌ 测试失败：{e}")
-        raise
+@pytest.mark.asyncio
+async def test_execute_plan_with_dependencies():
+    """测试带依赖标记的计划：依赖步骤在其依赖全部完成后执行"""
+    bridge = _StubBridge()
+    agent = DispatcherAgent("test-dispatch-008", bridge)
+    await agent.initialize()
+
+    steps = [
+        {"description": "监控", "tool_name": "getPOI",
+         "parameters": {"x_position": 1, "y_position": 1, "afdd": "a"}},
+        {"description": "值班", "tool_name": "showQw",
+         "parameters": {"gxdwdm": "110105"}},
+        {"description": "电话", "tool_name": "callPhone",
+         "parameters": {"phone": "13800138000"}, "dependencies": [0, 1]},
+    ]
+    agent.create_plan(steps)
+    results = await agent.execute_plan()
+
+    assert agent.status == "completed"
+    # 结果按步骤索引排序，与声明顺序一致
+    assert [r.tool_name for r in results] == ["getPOI", "showQw", "callPhone"]
+    assert all(r.success for r in results)
+    # 依赖步骤在其依赖之后完成
+    assert bridge.finished_order[-1] == "callPhone"
+
+    print("✅ 测试通过：依赖波次执行")
+
+@pytest.mark.asyncio
+async def test_execute_plan_dependency_cycle():
+    """测试依赖成环：计划失败且没有步骤被执行"""
+    bridge = _StubBridge()
+    agent = DispatcherAgent("test-dispatch-009", bridge)
+    await agent.initialize()
+
+    steps = [
+        {"description": "a", "tool_name": "getPOI",
+         "parameters": {}, "dependencies": [1]},
+        {"description": "b", "tool_name": "showQw",
+         "parameters": {}, "dependencies": [0]},
+    ]
+    agent.create_plan(steps)
+    results = await agent.execute_plan()
+
+    assert agent.status == "failed"
+    assert results == []
+    assert bridge.finished_order == []
+
+    print("✅ 测试通过：依赖成环检测")
+
+@pytest.mark.asyncio
+async def test_execute_plan_wave_failure_stops_dependents():
+    """测试波内失败：同波其余步骤有结果，依赖失败步骤的后续波不执行"""
+    bridge = _StubBridge(fail_tools={"getPOI"})
+    agent = DispatcherAgent("test-dispatch-010", bridge)
+    await agent.initialize()
+
+    steps = [
+        {"description": "失败步骤", "tool_name": "getPOI", "parameters": {}},
+        {"description": "同波步骤", "tool_name": "showQw", "parameters": {}},
+        {"description": "依赖失败步骤", "tool_name": "callPhone",
+         "parameters": {}, "dependencies": [0]},
+    ]
+    agent.create_plan(steps)
+    results = await agent.execute_plan(max_concurrent=2)
+
+    assert agent.status == "failed"
+    # 第一波的两个步骤都有结果；失败后不再推进下一波
+    assert len(results) == 2
+    assert "callPhone" not in bridge.finished_order
+    assert agent.execution_steps[2].status == "pending"
+
+    print("✅ 测试通过：波内失败停止推进")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    pytest.main([__file__, "-v"])
\ No newline at end of file
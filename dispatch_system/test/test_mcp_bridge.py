@@ -2,6 +2,7 @@
 单元测试：MCP桥接工具测试
 """
 
+import pytest
 import asyncio
 import sys
 import os
@@ -10,165 +11,161 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from mcp_bridge import MCPBridge, ToolResult
-from test.mock_mcp_client import mock_mcp_client
+from test.mock_mcp_client import MockToolResult, mock_mcp_client
 
+class _RecordingClient:
+    """确定性客户端：调用总是成功并记录分发过的工具名
+    批量调用的断言不能依赖 mock 客户端的随机成功率"""
+
+    def __init__(self):
+        self.calls = []
+
+    def list_tools(self):
+        return mock_mcp_client.list_tools()
+
+    async def call_tool(self, tool_name, parameters):
+        await asyncio.sleep(0)
+        self.calls.append(tool_name)
+        return MockToolResult(success=True, data={"tool": tool_name})
+
+# 所有用例共享同一个桥接实例：客户端和工具模板只构建一次，
+# 各用例仍使用独立的会话ID，互不影响会话级状态
+bridge = MCPBridge()
+
+@pytest.mark.asyncio
 async def test_mcp_bridge_initialization():
     """测试桥接初始化"""
-    bridge = MCPBridge()
     session_id = "test-session-001"
-    
+
     # 测试工具初始化
     tools = await bridge.initialize_tools(session_id)
-    
+
     assert len(tools) == 3
     assert "getPOI" in [tool["name"] for tool in tools]
     assert "showQw" in [tool["name"] for tool in tools]
     assert "callPhone" in [tool["name"] for tool in tools]
-    
-    print("✅ 测试通过：桥接初始化")
-
-async def test_get_poi_tool_call():
-    """测试getPOI工具调用"""
-    bridge = MCPBridge()
-    session_id = "test-session-002"
-    
-    # 初始化会话工具
+
+# 三个业务工具的调用用例只在工具名和参数上不同，参数化成同一个用例
+@pytest.mark.asyncio
+@pytest.mark.parametrize("session_id,tool_name,parameters", [
+    ("test-session-002", "getPOI", {
+        "x_position": 116.3974,
+        "y_position": 39.9093,
+        "afdd": "北京市朝阳区测试地址"
+    }),
+    ("test-session-003", "showQw", {"gxdwdm": "110105"}),
+    ("test-session-004", "callPhone", {"phone": "13800138000"}),
+])
+async def test_tool_call(session_id, tool_name, parameters):
+    """测试业务工具调用"""
     await bridge.initialize_tools(session_id)
-    
-    # 调用工具
-    result = await bridge.call_tool(
-        session_id,
-        "getPOI",
-        {
-            "x_position": 116.3974,
-            "y_position": 39.9093,
-            "afdd": "北京市朝阳区测试地址"
-        }
-    )
-    
+
+    result = await bridge.call_tool(session_id, tool_name, parameters)
+
     assert isinstance(result, ToolResult)
-    assert result.tool_name == "getPOI"
-    assert result.parameters["x_position"] == 116.3974
+    assert result.tool_name == tool_name
+    for key, value in parameters.items():
+        assert result.parameters[key] == value
     assert result.execution_time >= 0
-    
-    print(f"✅ 测试通过：getPOI工具调用，执行时间：{result.execution_time:.3f}s")
-    if result.success:
-        print(f"   结果：{result.data.get('message', '成功')}")
-    else:
-        print(f"   错误：{result.error}")
-
-async def test_show_qw_tool_call():
-    """测试showQw工具调用"""
-    bridge = MCPBridge()
-    session_id = "test-session-003"
-    
-    await bridge.initialize_tools(session_id)
-    
-    result = await bridge.call_tool(
-        session_id,
-        "showQw",
-        {"gxdwdm": "110105"}
-    )
-    
-    assert isinstance(result, ToolResult)
-    assert result.tool_name == "showQw"
-    assert result.parameters["gxdwdm"] == "110105"
-    
-    print(f"✅ 测试通过：showQw工具调用")
-
-async def test_call_phone_tool_call():
-    """测试callPhone工具调用"""
-    bridge = MCPBridge()
-    session_id = "test-session-004"
-    
-    await bridge.initialize_tools(session_id)
-    
-    result = await bridge.call_tool(
-        session_id,
-        "callPhone",
-        {"phone": "13800138000"}
-    )
-    
-    assert isinstance(result, ToolResult)
-    assert result.tool_name == "callPhone"
-    assert result.parameters["phone"] == "13800138000"
-    
-    print(f"✅ 测试通过：callPhone工具调用")
 
+@pytest.mark.asyncio
 async def test_tool_not_found():
     """测试工具不存在的情况"""
-    bridge = MCPBridge()
     session_id = "test-session-005"
-    
+
     await bridge.initialize_tools(session_id)
-    
+
     result = await bridge.call_tool(
         session_id,
         "invalid_tool",
         {}
     )
-    
+
     assert result.success == False
     assert "不可用" in result.error
-    
-    print(f"✅ 测试通过：工具不存在处理")
 
+@pytest.mark.asyncio
 async def test_missing_parameters():
     """测试缺少参数的情况"""
-    bridge = MCPBridge()
     session_id = "test-session-006"
-    
+
     await bridge.initialize_tools(session_id)
-    
+
     result = await bridge.call_tool(
         session_id,
         "getPOI",
         {"x_position": 116.3974}  # 缺少必需参数
     )
-    
+
     assert result.success == False
     assert "缺少必需参数" in result.error
-    
-    print(f"✅ 测试通过：缺少参数处理")
 
+@pytest.mark.asyncio
 async def test_session_isolation():
     """测试会话隔离"""
-    bridge = MCPBridge()
-    
     session1 = "session-001"
     session2 = "session-002"
-    
+
     # 初始化两个会话
     await bridge.initialize_tools(session1)
     await bridge.initialize_tools(session2)
-    
-    # 验证工具列表隔离
-    tools1 = bridge.get_available_tools(session1)
-    tools2 = bridge.get_available_tools(session2)
-    
-    assert set(tools1) == set(tools2)
-    assert len(tools1) == 3
-    
-    print(f"✅ 测试通过：会话隔离验证")
-
-async def main():
-    """运行所有测试"""
-    print("🧪 开始MCP桥接测试...")
-    
-    try:
-        await test_mcp_bridge_initialization()
-        await test_get_poi_tool_call()
-        await test_show_qw_tool_call()
-        await test_call_phone_tool_call()
-        await test_tool_not_found()
-        await test_missing_parameters()
-        await test_session_isolation()
-        
-        print("\n🎉 所有测试通过！MCP桥接功能正常")
-        
-    except Exception as e:
-        print(f"\n❌ 测试失败：{e}")
-        raise
+
+    # 验证工具列表隔离：签名在桥接侧缓存，比较时不重建集合
+    signature1 = bridge.tools_signature(session1)
+    signature2 = bridge.tools_signature(session2)
+
+    assert signature1 == signature2
+    assert len(signature1) == 3
+
+@pytest.mark.asyncio
+async def test_batch_call_tools_mixed():
+    """测试批量调用：成败混合，结果与 calls 顺序一一对应"""
+    client = _RecordingClient()
+    batch_bridge = MCPBridge(client=client)
+    session_id = "batch-session-001"
+
+    calls = [
+        ("getPOI", {"x_position": 116.3974, "y_position": 39.9093, "afdd": "测试地址"}),
+        ("invalid_tool", {}),
+        ("showQw", {"gxdwdm": "110105"}),
+    ]
+    # 会话未初始化：批量调用自带一次性的懒初始化
+    results = await batch_bridge.batch_call_tools(session_id, calls, max_concurrent=2)
+
+    assert [r.tool_name for r in results] == ["getPOI", "invalid_tool", "showQw"]
+    assert results[0].success and results[2].success
+    assert results[1].success == False
+    assert "不可用" in results[1].error
+    # 不可用的工具在校验阶段被拦下，不会分发到客户端
+    assert "invalid_tool" not in client.calls
+
+@pytest.mark.asyncio
+async def test_batch_call_tools_stop_on_error():
+    """测试 stop_on_error 短路：任一工具名校验失败则整批不分发"""
+    client = _RecordingClient()
+    batch_bridge = MCPBridge(client=client)
+    session_id = "batch-session-002"
+
+    calls = [
+        ("getPOI", {"x_position": 116.3974, "y_position": 39.9093, "afdd": "测试地址"}),
+        ("invalid_tool", {}),
+    ]
+    results = await batch_bridge.batch_call_tools(
+        session_id, calls, stop_on_error=True
+    )
+
+    # 整批标记失败，有效的调用也不执行
+    assert len(results) == 2
+    assert all(r.success == False for r in results)
+    assert all("不可用工具" in r.error for r in results)
+    assert client.calls == []
+
+@pytest.mark.asyncio
+async def test_batch_call_tools_empty():
+    """测试空批量调用"""
+    batch_bridge = MCPBridge(client=_RecordingClient())
+
+    assert await batch_bridge.batch_call_tools("batch-session-003", []) == []
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    pytest.main([__file__, "-v"])
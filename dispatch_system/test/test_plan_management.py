@@ -7,18 +7,27 @@ import uuid
 from typing import Dict, List
 from datetime import datetime
 
+# 计划步骤内容固定，模块级构建一次，不再每个用例重建列表
+_TEST_STEPS = (
+    "[业务工具] getPOI 参数为 x_position: 123.456789, y_position: 39.123456",
+    "[业务工具] showQw 参数为 gxdwdm: 110105",
+    "[业务工具] callPhone 参数为 phone: 13800138000"
+)
+
 class TestPlanManagement:
     """测试计划管理工具"""
-    
-    def setup_method(self):
-        """每个测试方法前的初始化"""
-        self.execution_id = str(uuid.uuid4())
-        self.test_steps = [
-            "[业务工具] getPOI 参数为 x_position: 123.456789, y_position: 39.123456",
-            "[业务工具] showQw 参数为 gxdwdm: 110105",
-            "[业务工具] callPhone 参数为 phone: 13800138000"
-        ]
-    
+
+    @pytest.fixture
+    def execution_id(self):
+        """每个用例独立的执行ID；hex 形式省去连字符格式化"""
+        return uuid.uuid4().hex
+
+    @pytest.fixture
+    def test_steps(self):
+        """共享的计划步骤（不可变元组）"""
+        return _TEST_STEPS
+
+
     def test_pause_plan(self):
         """测试暂停计划"""
         # TODO: 实现pause_plan测试
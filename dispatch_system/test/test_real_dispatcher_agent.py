@@ -0,0 +1,114 @@
+"""
+单元测试：RealDispatcherAgent 并发执行路径测试（桩桥接，不依赖真实MCP服务器）
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from real_dispatcher_agent import RealDispatcherAgent
+from real_mcp_bridge import RealToolResult
+
+class _StubRealBridge:
+    """确定性桩桥接：替代真实MCP连接，按工具名返回预设成败并记录完成顺序"""
+
+    def __init__(self, fail_tools=()):
+        self.fail_tools = set(fail_tools)
+        self.finished_order = []
+
+    async def connect(self):
+        return True
+
+    def is_connected(self):
+        return True
+
+    async def call_tool(self, tool_name, parameters):
+        await asyncio.sleep(0)
+        self.finished_order.append(tool_name)
+        if tool_name in self.fail_tools:
+            return RealToolResult(
+                success=False, error="桩：预设失败",
+                tool_name=tool_name, parameters=parameters
+            )
+        return RealToolResult(
+            success=True, data={}, tool_name=tool_name, parameters=parameters
+        )
+
+    async def disconnect(self):
+        return True
+
+_STEPS = [
+    {"description": "监控", "tool_name": "getPOI",
+     "parameters": {"x_position": 1, "y_position": 1, "afdd": "a"}},
+    {"description": "值班", "tool_name": "showQw",
+     "parameters": {"gxdwdm": "110105"}},
+    {"description": "电话", "tool_name": "callPhone",
+     "parameters": {"phone": "13800138000"}},
+]
+
+@pytest.mark.asyncio
+async def test_execute_plan_parallel_layers():
+    """测试分层并发：同层并发、下一层在上一层完成后执行"""
+    bridge = _StubRealBridge()
+    agent = RealDispatcherAgent("real-test-001", bridge)
+    await agent.initialize()
+
+    agent.create_plan(_STEPS)
+    results = await agent.execute_plan_parallel([[0, 1], [2]])
+
+    assert agent.status == "completed"
+    # 结果按步骤索引排序
+    assert [r.tool_name for r in results] == ["getPOI", "showQw", "callPhone"]
+    assert all(r.success for r in results)
+    # 第二层在第一层全部完成后才执行
+    assert bridge.finished_order[-1] == "callPhone"
+
+@pytest.mark.asyncio
+async def test_execute_plan_parallel_layer_failure():
+    """测试层内失败：计划失败，后续层不执行"""
+    bridge = _StubRealBridge(fail_tools={"showQw"})
+    agent = RealDispatcherAgent("real-test-002", bridge)
+    await agent.initialize()
+
+    agent.create_plan(_STEPS)
+    results = await agent.execute_plan_parallel([[0, 1], [2]])
+
+    assert agent.status == "failed"
+    # 第一层两个步骤都有结果；失败后第二层不再执行
+    assert len(results) == 2
+    assert "callPhone" not in bridge.finished_order
+
+@pytest.mark.asyncio
+async def test_execute_plan_dag_frontier():
+    """测试依赖前沿执行：依赖满足的步骤并发启动，结果按索引排序"""
+    bridge = _StubRealBridge()
+    agent = RealDispatcherAgent("real-test-003", bridge)
+    await agent.initialize()
+
+    agent.create_plan(_STEPS)
+    results = await agent.execute_plan_dag({2: [0, 1]})
+
+    assert agent.status == "completed"
+    assert [r.tool_name for r in results] == ["getPOI", "showQw", "callPhone"]
+    assert bridge.finished_order[-1] == "callPhone"
+
+@pytest.mark.asyncio
+async def test_execute_plan_dag_cycle():
+    """测试依赖成环：前沿为空时计划失败，没有步骤被执行"""
+    bridge = _StubRealBridge()
+    agent = RealDispatcherAgent("real-test-004", bridge)
+    await agent.initialize()
+
+    agent.create_plan(_STEPS[:2])
+    results = await agent.execute_plan_dag({0: [1], 1: [0]})
+
+    assert agent.status == "failed"
+    assert results == []
+    assert bridge.finished_order == []
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -2,7 +2,9 @@
 测试真实MCP连接
 """
 
+import pytest
 import asyncio
+import socket
 import sys
 import os
 
@@ -11,6 +13,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from real_mcp_bridge import RealMCPBridge
 
+@pytest.mark.asyncio
 async def test_real_mcp_connection():
     """测试真实MCP连接"""
     bridge = RealMCPBridge("http://localhost:4000/mcp")
@@ -33,53 +36,40 @@ async def test_real_mcp_connection():
             
             # 测试特定工具（如果存在）
             tool_names = [t['name'] for t in tools]
-            
-            # 测试getPOI工具
-            if 'getPOI' in tool_names:
-                print("\n🧪 测试 getPOI 工具...")
-                result = await bridge.call_tool(
-                    "getPOI",
-                    {
-                        "x_position": "116.3974",  # 改为字符串类型
-                        "y_position": "39.9093",
-                        "afdd": "北京市朝阳区测试地址"
-                    }
-                )
-                
-                print(f"   结果：{result.success}")
-                if result.success:
-                    print(f"   数据：{result.data}")
-                else:
-                    print(f"   错误：{result.error}")
-            
-            # 测试showQw工具
-            if 'showQw' in tool_names:
-                print("\n🧪 测试 showQw 工具...")
-                result = await bridge.call_tool(
-                    "showQw",
-                    {"gxdwdm": "110105"}
-                )
-                
-                print(f"   结果：{result.success}")
-                if result.success:
-                    print(f"   数据：{result.data}")
-                else:
-                    print(f"   错误：{result.error}")
-            
-            # 测试callPhone工具
-            if 'callPhone' in tool_names:
-                print("\n🧪 测试 callPhone 工具...")
-                result = await bridge.call_tool(
-                    "callPhone",
-                    {"phone": "13800138000"}
-                )
-                
+
+            tool_calls = [
+                ("getPOI", {
+                    "x_position": "116.3974",  # 改为字符串类型
+                    "y_position": "39.9093",
+                    "afdd": "北京市朝阳区测试地址"
+                }),
+                ("showQw", {"gxdwdm": "110105"}),
+                ("callPhone", {"phone": "13800138000"})
+            ]
+            available_calls = [
+                (name, parameters)
+                for name, parameters in tool_calls
+                if name in tool_names
+            ]
+
+            # 三个工具调用相互独立，并发下发让网络往返相互重叠；
+            # return_exceptions=True 保证单个工具异常不影响其余调用
+            results = await asyncio.gather(
+                *(bridge.call_tool(name, parameters) for name, parameters in available_calls),
+                return_exceptions=True
+            )
+
+            for (name, _), result in zip(available_calls, results):
+                print(f"\n🧪 测试 {name} 工具...")
+                if isinstance(result, BaseException):
+                    print(f"   异常：{result}")
+                    continue
                 print(f"   结果：{result.success}")
                 if result.success:
                     print(f"   数据：{result.data}")
                 else:
                     print(f"   错误：{result.error}")
-            
+
         else:
             print("❌ 连接失败")
             
@@ -91,12 +81,19 @@ async def test_real_mcp_connection():
         await bridge.disconnect()
         print("🔌 连接已关闭")
 
+@pytest.mark.asyncio
 async def test_connection_fallback():
     """测试连接失败回退"""
     print("\n🧪 测试连接失败回退...")
-    
-    # 测试无效的MCP服务器
-    bridge = RealMCPBridge("http://localhost:9999/mcp")
+
+    # 先绑定再释放拿到一个此刻必然无人监听的端口：连接立即被拒绝，
+    # 不再赌固定端口恰好空闲，也不会在防火墙丢包时等到客户端默认超时
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+
+    bridge = RealMCPBridge(f"http://127.0.0.1:{port}/mcp", connect_timeout=2.0)
     
     try:
         success = await bridge.connect()
@@ -112,18 +109,5 @@ async def test_connection_fallback():
     finally:
         await bridge.disconnect()
 
-async def main():
-    """主测试函数"""
-    print("🚀 开始真实MCP服务器测试...")
-    print("=" * 50)
-    
-    # 测试真实MCP连接
-    await test_real_mcp_connection()
-    
-    # 测试连接失败回退
-    await test_connection_fallback()
-    
-    print("\n🎯 测试完成！")
-
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -11,19 +11,24 @@ from concurrent.futures import ThreadPoolExecutor
 class TestSessionIsolation:
     """测试会话隔离"""
     
-    def setup_method(self):
-        """每个测试方法前的初始化"""
-        self.session_ids = [str(uuid.uuid4()) for _ in range(3)]
-    
-    def test_unique_session_ids(self):
+    @pytest.fixture(scope="class")
+    def session_ids(self):
+        """整个测试类共享的一组会话ID
+
+        类作用域只生成一次，不再每个用例各跑一轮 uuid4；
+        hex 形式省去连字符格式化。
+        """
+        return tuple(uuid.uuid4().hex for _ in range(3))
+
+    def test_unique_session_ids(self, session_ids):
         """测试会话ID唯一性"""
-        assert len(set(self.session_ids)) == len(self.session_ids)
-    
-    def test_session_data_isolation(self):
+        assert len(set(session_ids)) == len(session_ids)
+
+    def test_session_data_isolation(self, session_ids):
         """测试会话数据隔离"""
         # TODO: 实现数据隔离测试
         session_data = {}
-        for session_id in self.session_ids:
+        for session_id in session_ids:
             session_data[session_id] = {
                 "plan_id": str(uuid.uuid4()),
                 "current_step": 0,